@@ -37,3 +37,14 @@ pytest_plugins = [
     'tests.fixtures.fixture_user',
     'tests.fixtures.fixture_data',
 ]
+
+
+import pytest
+
+from core.testing import test_environment
+
+
+@pytest.fixture(autouse=True, scope='session')
+def yatube_test_environment():
+    with test_environment():
+        yield
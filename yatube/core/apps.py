@@ -1,5 +1,35 @@
 from django.apps import AppConfig
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+
+CACHED_SESSION_ENGINES = (
+    'django.contrib.sessions.backends.cache',
+    'django.contrib.sessions.backends.cached_db',
+)
+
+
+def check_session_cache():
+    """Refuse sessions cached in one process only.
+
+    Logout drops the session from the cache of one worker, the others
+    would keep a logged out session until SESSION_COOKIE_AGE runs out.
+    """
+    from django.core.cache import caches
+
+    from .middleware.auth import PROCESS_LOCAL_CACHES
+
+    if settings.SESSION_ENGINE not in CACHED_SESSION_ENGINES:
+        return
+    if isinstance(caches[settings.SESSION_CACHE_ALIAS],
+                  PROCESS_LOCAL_CACHES):
+        raise ImproperlyConfigured(
+            f'{settings.SESSION_ENGINE} sessions need a cache shared by '
+            'all workers.')
 
 
 class CoreConfig(AppConfig):
     name = 'core'
+
+    def ready(self):
+        from . import signals  # noqa: F401
+        check_session_cache()
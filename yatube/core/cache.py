@@ -0,0 +1,23 @@
+from django.core.cache.backends import locmem
+
+from core.metrics import metrics
+
+MISSING = object()
+
+
+class MetricsCacheMixin:
+    """Count hits and misses of cache lookups in the metrics.
+
+    Backends without a native get_many look keys up with get(), so each
+    key is counted once.
+    """
+
+    def get(self, key, default=None, version=None):
+        value = super().get(key, MISSING, version)
+        result = 'miss' if value is MISSING else 'hit'
+        metrics.inc('yatube_cache_requests_total', (('result', result),))
+        return default if value is MISSING else value
+
+
+class LocMemCache(MetricsCacheMixin, locmem.LocMemCache):
+    pass
@@ -0,0 +1,51 @@
+import re
+
+from django.template.loaders.base import Loader
+
+# {% comment %} blocks span lines, {# #} comments end on their line
+COMMENT_RE = re.compile(
+    r'(?s:{%\s*comment\b.*?%}.*?{%\s*endcomment\s*%})|{#.*?#}')
+PROTECTED_RE = re.compile(
+    r'(<(pre|textarea)\b.*?</\2\s*>)', re.DOTALL | re.IGNORECASE)
+NEWLINE_SPACE_RE = re.compile(r'[ \t\r\f\v]*\n\s*')
+
+
+def minify(source):
+    """Drop template comments and indentation from the template source.
+
+    Every run of whitespace with a line break becomes one line break, so
+    words never get glued together. Contents of <pre> and <textarea> are
+    kept as they are.
+    """
+    parts = PROTECTED_RE.split(source)
+    result = []
+    # split() gives text, whole protected block and its tag name in turn
+    for index in range(0, len(parts), 3):
+        text = COMMENT_RE.sub('', parts[index])
+        result.append(NEWLINE_SPACE_RE.sub('\n', text))
+        if index + 1 < len(parts):
+            result.append(parts[index + 1])
+    return ''.join(result)
+
+
+class MinifyingLoader(Loader):
+    """Loader minifying templates of its child loaders before compiling.
+
+    Put it inside the cached loader so the work is done once per template
+    and not on every request.
+    """
+
+    def __init__(self, engine, loaders):
+        super().__init__(engine)
+        self.loaders = engine.get_template_loaders(loaders)
+
+    def get_contents(self, origin):
+        return minify(origin.loader.get_contents(origin))
+
+    def get_template_sources(self, template_name):
+        for loader in self.loaders:
+            yield from loader.get_template_sources(template_name)
+
+    def reset(self):
+        for loader in self.loaders:
+            loader.reset()
@@ -0,0 +1,84 @@
+import base64
+import json
+from email import message_from_bytes
+from email.mime.base import MIMEBase
+
+from django.core.mail import EmailMultiAlternatives
+from django.core.mail.backends.base import BaseEmailBackend
+from django.utils import timezone
+
+from .models import OutboxMessage
+
+MESSAGE_FIELDS = ('subject', 'body', 'from_email', 'to', 'cc', 'bcc',
+                  'reply_to', 'extra_headers')
+
+
+def dump_message(message):
+    """Serialize an EmailMessage to JSON."""
+    data = {field: getattr(message, field) for field in MESSAGE_FIELDS}
+    data['alternatives'] = getattr(message, 'alternatives', [])
+    data['attachments'] = []
+    for attachment in message.attachments:
+        if isinstance(attachment, MIMEBase):
+            # A ready MIME part is kept with its headers as it is
+            content = base64.b64encode(attachment.as_bytes()).decode()
+            data['attachments'].append({'mime': content})
+            continue
+        filename, content, mimetype = attachment
+        if isinstance(content, str):
+            content = content.encode()
+        data['attachments'].append(
+            (filename, base64.b64encode(content).decode(), mimetype))
+    return json.dumps(data)
+
+
+def load_mime(content):
+    """Rebuild a MIMEBase attachment from its serialized bytes."""
+    parsed = message_from_bytes(base64.b64decode(content))
+    part = MIMEBase(
+        parsed.get_content_maintype(), parsed.get_content_subtype())
+    for name in part.keys():
+        del part[name]
+    for name, value in parsed.items():
+        part[name] = value
+    part.set_payload(parsed.get_payload())
+    return part
+
+
+def load_message(payload, connection=None):
+    """Restore an EmailMessage serialized by dump_message."""
+    data = json.loads(payload)
+    attachments = data.pop('attachments')
+    alternatives = data.pop('alternatives')
+    headers = data.pop('extra_headers')
+    message = EmailMultiAlternatives(
+        headers=headers,
+        alternatives=[tuple(alternative) for alternative in alternatives],
+        connection=connection,
+        **data,
+    )
+    for attachment in attachments:
+        if isinstance(attachment, dict):
+            message.attach(load_mime(attachment['mime']))
+            continue
+        filename, content, mimetype = attachment
+        message.attach(filename, base64.b64decode(content), mimetype)
+    return message
+
+
+class OutboxEmailBackend(BaseEmailBackend):
+    """Email backend that stores messages in the outbox table.
+
+    Sending only inserts rows, delivery is done outside of the request by
+    the send_outbox command through OUTBOX_EMAIL_BACKEND.
+    """
+
+    def send_messages(self, email_messages):
+        now = timezone.now()
+        messages = [
+            OutboxMessage(payload=dump_message(message), next_attempt_at=now)
+            for message in email_messages
+            if message.recipients()
+        ]
+        OutboxMessage.objects.bulk_create(messages)
+        return len(messages)
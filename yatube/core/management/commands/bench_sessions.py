@@ -0,0 +1,54 @@
+import statistics
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.test import Client
+from django.test.utils import override_settings
+from django.urls import reverse
+
+User = get_user_model()
+
+SESSION_BACKENDS = ('db', 'cached_db', 'cache', 'signed_cookies')
+
+
+class Command(BaseCommand):
+    help = 'Measure authenticated index latency for each session backend.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--requests', type=int, default=200,
+            help='Number of timed requests per backend.')
+        parser.add_argument(
+            '--backend', action='append', choices=SESSION_BACKENDS,
+            help='Backend to measure, may be repeated. Defaults to all.')
+
+    def handle(self, *args, **options):
+        url = reverse('posts:index')
+        for backend in options['backend'] or SESSION_BACKENDS:
+            engine = f'django.contrib.sessions.backends.{backend}'
+            with override_settings(SESSION_ENGINE=engine):
+                timings = self.measure(url, options['requests'])
+            timings.sort()
+            self.stdout.write(
+                f'{backend:>15}: '
+                f'mean {statistics.mean(timings):.2f} ms, '
+                f'p50 {timings[len(timings) // 2]:.2f} ms, '
+                f'p95 {timings[int(len(timings) * 0.95)]:.2f} ms')
+
+    def measure(self, url, requests):
+        """Return latencies of authenticated GETs in milliseconds."""
+        # The benchmark user and its sessions are rolled back afterwards
+        with transaction.atomic():
+            user = User.objects.create_user(username='bench_sessions')
+            client = Client()
+            client.force_login(user)
+            client.get(url)
+            timings = []
+            for _ in range(requests):
+                started = time.perf_counter()
+                client.get(url)
+                timings.append((time.perf_counter() - started) * 1000)
+            transaction.set_rollback(True)
+        return timings
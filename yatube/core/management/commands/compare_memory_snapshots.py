@@ -0,0 +1,42 @@
+import glob
+import os
+import tracemalloc
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from core.middleware.memory import snapshot_path
+
+
+class Command(BaseCommand):
+    help = ('Compare allocations of two snapshots dumped by '
+            'MemoryProfileMiddleware, given as files or view names.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('base', help='Snapshot file or view name.')
+        parser.add_argument('other', help='Snapshot file or view name.')
+        parser.add_argument(
+            '--top', type=int, default=settings.MEMORY_PROFILE_TOP,
+            help='Number of allocation sites to show.')
+        parser.add_argument(
+            '--group-by', default='lineno',
+            choices=('filename', 'lineno', 'traceback'))
+
+    def load(self, name):
+        """Load the snapshot file or the latest snapshot of the view."""
+        if not os.path.isfile(name):
+            dumps = sorted(glob.glob(snapshot_path(name, '*')))
+            if not dumps:
+                raise CommandError(f'No snapshots of {name}')
+            name = dumps[-1]
+        self.stdout.write(f'Loading {name}')
+        return tracemalloc.Snapshot.load(name)
+
+    def handle(self, *args, **options):
+        base = self.load(options['base'])
+        other = self.load(options['other'])
+        stats = other.compare_to(base, options['group_by'])
+        total = sum(stat.size_diff for stat in stats)
+        self.stdout.write(f'Total difference: {total:+d} bytes')
+        for stat in stats[:options['top']]:
+            self.stdout.write(str(stat))
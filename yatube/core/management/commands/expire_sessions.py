@@ -0,0 +1,35 @@
+from importlib import import_module
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+
+from core.utils import pk_chunks
+
+
+class Command(BaseCommand):
+    help = 'Delete expired sessions in batches.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size', type=int, default=settings.BULK_CHUNK_SIZE,
+            help='Number of sessions deleted per transaction.')
+
+    def handle(self, *args, **options):
+        engine = import_module(settings.SESSION_ENGINE)
+        store = engine.SessionStore
+        if not hasattr(store, 'get_model_class'):
+            # Cache and cookie sessions expire by themselves
+            store.clear_expired()
+            self.stdout.write('Session backend has no table to clean.')
+            return
+        model = store.get_model_class()
+        expired = model.objects.filter(expire_date__lt=timezone.now())
+        deleted = 0
+        for chunk in pk_chunks(expired, options['batch_size']):
+            with transaction.atomic():
+                deleted += model.objects.filter(pk__in=chunk).delete()[0]
+            self.stdout.write(f'Deleted {deleted} expired sessions...')
+        self.stdout.write(self.style.SUCCESS(
+            f'Expired sessions deleted: {deleted}'))
@@ -0,0 +1,50 @@
+import copy
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db.models import Count
+from django.test import Client
+from django.test.utils import override_settings
+from django.urls import reverse
+
+from posts.models import GroupStats, User
+
+PLAIN_LOADERS = [
+    'django.template.loaders.filesystem.Loader',
+    'django.template.loaders.app_directories.Loader',
+]
+
+
+class Command(BaseCommand):
+    help = 'Compare response sizes of feeds with and without minification.'
+
+    def feed_urls(self):
+        urls = [reverse('posts:index')]
+        stats = GroupStats.objects.select_related('group').order_by(
+            '-posts_count').first()
+        if stats is not None:
+            urls.append(reverse('posts:group_list',
+                                kwargs={'slug': stats.group.slug}))
+        author = User.objects.annotate(
+            posts_total=Count('posts')).order_by('-posts_total').first()
+        if author is not None:
+            urls.append(reverse('posts:profile',
+                                kwargs={'username': author.username}))
+        return urls
+
+    def sizes(self, urls, templates):
+        with override_settings(TEMPLATES=templates):
+            client = Client()
+            return [len(client.get(url).content) for url in urls]
+
+    def handle(self, *args, **options):
+        plain = copy.deepcopy(settings.TEMPLATES)
+        plain[0]['OPTIONS']['loaders'] = PLAIN_LOADERS
+        urls = self.feed_urls()
+        before = self.sizes(urls, plain)
+        after = self.sizes(urls, settings.TEMPLATES)
+        for url, plain_size, minified_size in zip(urls, before, after):
+            saved = 100 * (plain_size - minified_size) / plain_size
+            self.stdout.write(
+                f'{url}: {plain_size} -> {minified_size} bytes '
+                f'({saved:.1f}% less)')
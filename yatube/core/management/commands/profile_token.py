@@ -0,0 +1,22 @@
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+
+from core.middleware.profile import profile_token
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = ('Print the token a staff user sends in the X-Profile header '
+            'or the profile query parameter to profile a request.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('username')
+
+    def handle(self, *args, **options):
+        try:
+            user = User.objects.get(
+                username=options['username'], is_staff=True)
+        except User.DoesNotExist:
+            raise CommandError(f'No staff user {options["username"]}')
+        self.stdout.write(profile_token(user))
@@ -0,0 +1,102 @@
+import time
+from contextlib import nullcontext, suppress
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.mail import get_connection
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.utils import timezone
+
+from core.mail import load_message
+from core.models import OutboxMessage
+
+
+class Command(BaseCommand):
+    help = 'Deliver emails from the outbox in batches.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--once', action='store_true',
+            help='Exit when no messages are due instead of polling.')
+        parser.add_argument(
+            '--batch-size', type=int, default=settings.OUTBOX_BATCH_SIZE,
+            help='Number of messages claimed at a time.')
+        parser.add_argument(
+            '--poll-interval', type=float, default=5,
+            help='Seconds to wait when the outbox is empty.')
+
+    def handle(self, *args, **options):
+        connection = get_connection(settings.OUTBOX_EMAIL_BACKEND)
+        sent = failed = 0
+        try:
+            while True:
+                batch = self.claim(options['batch_size'])
+                if not batch:
+                    if options['once']:
+                        break
+                    time.sleep(options['poll_interval'])
+                    continue
+                # One connection is reused for the whole batch
+                self.reopen(connection)
+                for message in batch:
+                    if self.deliver(message, connection):
+                        sent += 1
+                    else:
+                        failed += 1
+                connection.close()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            connection.close()
+        self.stdout.write(self.style.SUCCESS(
+            f'Emails sent: {sent}, failed: {failed}'))
+
+    def claim(self, batch_size):
+        """Lock due messages for this worker until their lease expires.
+
+        The UPDATE leases only rows that are still due, and only rows
+        carrying this worker's lease are returned, so a message taken by
+        another worker after the SELECT is not sent twice. Databases with
+        row locks skip rows another worker is claiming. SQLite has none
+        and would fail to upgrade the read lock of a transaction, so
+        there the statements run on their own.
+        """
+        now = timezone.now()
+        lease = now + timedelta(seconds=settings.OUTBOX_LEASE_TIMEOUT)
+        due = OutboxMessage.objects.filter(next_attempt_at__lte=now)
+        locking = connection.features.has_select_for_update
+        with transaction.atomic() if locking else nullcontext():
+            pks = list(due.select_for_update(skip_locked=True).values_list(
+                'pk', flat=True)[:batch_size])
+            due.filter(pk__in=pks).update(next_attempt_at=lease)
+        return list(OutboxMessage.objects.filter(
+            pk__in=pks, next_attempt_at=lease))
+
+    def deliver(self, message, connection):
+        """Send one message, schedule a retry with backoff on failure."""
+        try:
+            load_message(message.payload, connection).send()
+        except Exception as error:
+            message.attempts += 1
+            message.last_error = repr(error)
+            if message.attempts >= settings.OUTBOX_MAX_ATTEMPTS:
+                message.next_attempt_at = None
+            else:
+                delay = settings.OUTBOX_RETRY_DELAY * 2 ** (
+                    message.attempts - 1)
+                message.next_attempt_at = timezone.now() + timedelta(
+                    seconds=delay)
+            message.save(update_fields=(
+                'attempts', 'last_error', 'next_attempt_at'))
+            # The connection may be broken, start a new one
+            self.reopen(connection)
+            return False
+        message.delete()
+        return True
+
+    def reopen(self, connection):
+        """Open a fresh connection, failures are left to deliver()."""
+        connection.close()
+        with suppress(OSError):
+            connection.open()
@@ -0,0 +1,55 @@
+import glob
+import json
+from collections import defaultdict
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from core.slow_queries import fingerprint
+
+
+class Command(BaseCommand):
+    help = ('Summarize the slow query log by query fingerprint, '
+            'worst total time first.')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--top', type=int, default=10,
+            help='Number of fingerprints to show.')
+        parser.add_argument(
+            '--log', default=settings.SLOW_QUERY_LOG,
+            help='Log file, its rotated backups are read too.')
+
+    def entries(self, path):
+        for name in sorted(glob.glob(f'{glob.escape(path)}*')):
+            with open(name, encoding='utf-8') as log:
+                for line in log:
+                    try:
+                        yield json.loads(line)
+                    except ValueError:
+                        continue
+
+    def handle(self, *args, **options):
+        groups = defaultdict(list)
+        for entry in self.entries(options['log']):
+            groups[fingerprint(entry['sql'])].append(entry)
+        worst = sorted(
+            groups.items(),
+            key=lambda item: sum(entry['duration'] for entry in item[1]),
+            reverse=True,
+        )
+        for query, entries in worst[:options['top']]:
+            durations = [entry['duration'] for entry in entries]
+            views = sorted({str(entry['view']) for entry in entries})
+            explained = [entry for entry in entries if entry['plan']]
+            self.stdout.write(self.style.WARNING(
+                f'{len(entries)} queries, total {sum(durations):.3f}s, '
+                f'max {max(durations):.3f}s, views: {", ".join(views)}'))
+            self.stdout.write(query)
+            if explained:
+                slowest = max(explained, key=lambda entry: entry['duration'])
+                for line in slowest['plan']:
+                    self.stdout.write(f'  {line}')
+            self.stdout.write('')
+        if not groups:
+            self.stdout.write('No slow queries logged.')
@@ -0,0 +1,258 @@
+import fcntl
+import glob
+import json
+import logging
+import os
+import tempfile
+import threading
+import time
+import weakref
+from collections import Counter
+
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+COUNT_BUCKETS = (1, 2, 5, 10, 20, 50, 100, 200)
+
+# name: (type, help, histogram buckets)
+METRICS = {
+    'yatube_requests_total': (
+        'counter', 'Requests by view and status.', None),
+    'yatube_request_duration_seconds': (
+        'histogram', 'Request latency by view and status.',
+        DURATION_BUCKETS),
+    'yatube_db_queries_per_request': (
+        'histogram', 'Queries run by a request by view.', COUNT_BUCKETS),
+    'yatube_db_query_duration_seconds': (
+        'histogram', 'Query latency by view.', DURATION_BUCKETS),
+    'yatube_cache_requests_total': (
+        'counter', 'Cache lookups by result.', None),
+    'yatube_template_render_seconds': (
+        'histogram', 'Template render time by template.', DURATION_BUCKETS),
+}
+HISTOGRAM_SUFFIXES = ('_bucket', '_sum', '_count')
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+# Sums of workers that are gone, see fold_dead_workers()
+TOTALS_FILE = 'totals.json'
+
+
+class Metrics:
+    """Metrics of this process, aggregated across workers on disk.
+
+    Every thread records into its own Counter, so recording takes no
+    lock. The totals of the process are written to a file of its own in
+    METRICS_DIR at most every METRICS_FLUSH_INTERVAL seconds and, in
+    serving processes, on exit. collect() sums the files of all workers.
+    """
+
+    def __init__(self):
+        self.local = threading.local()
+        self.lock = threading.Lock()
+        self.shards = {}
+        self.retired = Counter()
+        self.flushed_at = time.monotonic()
+        self.pid = self.started = None
+
+    def shard(self):
+        shard = getattr(self.local, 'shard', None)
+        if shard is None:
+            shard = self.local.shard = Counter()
+            with self.lock:
+                self.shards[id(shard)] = shard
+            weakref.finalize(threading.current_thread(), self.retire, shard)
+        return shard
+
+    def retire(self, shard):
+        """Keep the counts of a finished thread."""
+        with self.lock:
+            self.retired.update(self.shards.pop(id(shard)))
+
+    def inc(self, name, labels, value=1):
+        self.shard()[name, labels] += value
+
+    def observe(self, name, labels, value):
+        shard = self.shard()
+        for bound in METRICS[name][2]:
+            # Empty buckets are written too, every series has all of them
+            shard[f'{name}_bucket', labels + (('le', str(bound)),)] += (
+                value <= bound)
+        shard[f'{name}_bucket', labels + (('le', '+Inf'),)] += 1
+        shard[f'{name}_sum', labels] += value
+        shard[f'{name}_count', labels] += 1
+
+    def totals(self):
+        with self.lock:
+            shards = list(self.shards.values())
+            totals = Counter(self.retired)
+        for shard in shards:
+            totals.update(dict(shard))
+        return totals
+
+    def flush(self):
+        """Write the totals of this process to its file in METRICS_DIR."""
+        self.flushed_at = time.monotonic()
+        samples = dump_samples(self.totals())
+        os.makedirs(settings.METRICS_DIR, exist_ok=True)
+        write_json(self.path(), samples)
+
+    def path(self):
+        """File of this process, named by its pid and start time.
+
+        A worker started later with a reused pid gets a file of its own
+        instead of overwriting the totals of the dead one.
+        """
+        if self.pid != os.getpid():
+            self.pid = os.getpid()
+            self.started = time.time_ns()
+        return os.path.join(
+            settings.METRICS_DIR, f'{self.pid}-{self.started}.json')
+
+    def flush_if_due(self):
+        if (time.monotonic() - self.flushed_at
+                >= settings.METRICS_FLUSH_INTERVAL):
+            self.flush()
+
+    def flush_on_exit(self):
+        try:
+            self.flush()
+        except Exception:
+            logger.exception('Metrics were not written on exit')
+
+
+def write_json(path, value):
+    """Replace the file atomically, readers never see a partial one."""
+    with tempfile.NamedTemporaryFile(
+            'w', dir=os.path.dirname(path), suffix='.tmp',
+            delete=False) as spool:
+        json.dump(value, spool)
+    os.replace(spool.name, path)
+
+
+def parse_samples(rows):
+    return Counter({
+        (name, tuple(map(tuple, labels))): value
+        for name, labels, value in rows
+    })
+
+
+def dump_samples(samples):
+    return [[name, labels, value]
+            for (name, labels), value in samples.items()]
+
+
+def read_samples(path):
+    try:
+        with open(path) as spool:
+            return parse_samples(json.load(spool))
+    except (OSError, ValueError):
+        return Counter()
+
+
+def is_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+def worker_files():
+    """Return (pid, path) of the files of workers in METRICS_DIR."""
+    files = []
+    for path in glob.glob(os.path.join(settings.METRICS_DIR, '*-*.json')):
+        pid = os.path.basename(path).split('-', 1)[0]
+        if pid.isdigit():
+            files.append((int(pid), path))
+    return files
+
+
+def fold_dead_workers(path):
+    """Add the files of workers that are gone to the totals at path.
+
+    Exported counters never go back, and the directory does not grow
+    with every restarted worker. The totals list the folded files, so a
+    fold interrupted before they are removed does not count them twice.
+    Return the totals.
+    """
+    try:
+        with open(path) as spool:
+            totals = json.load(spool)
+    except (OSError, ValueError):
+        totals = {'folded': [], 'samples': []}
+    samples = parse_samples(totals['samples'])
+    folded = set(totals['folded'])
+    dead = [file for pid, file in worker_files() if not is_alive(pid)]
+    if not dead:
+        return samples
+    for file in dead:
+        name = os.path.basename(file)
+        if name not in folded:
+            samples.update(read_samples(file))
+            folded.add(name)
+    write_json(path, {'folded': sorted(folded),
+                      'samples': dump_samples(samples)})
+    for file in dead:
+        os.remove(file)
+    write_json(path, {'folded': [], 'samples': dump_samples(samples)})
+    return samples
+
+
+def collect():
+    """Return the sum of the metrics written by all workers."""
+    os.makedirs(settings.METRICS_DIR, exist_ok=True)
+    # Scrapes fold and read one at a time, so none of them counts a
+    # folded file twice or misses it
+    with open(os.path.join(settings.METRICS_DIR, '.lock'), 'w') as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        samples = fold_dead_workers(
+            os.path.join(settings.METRICS_DIR, TOTALS_FILE))
+        for _, path in worker_files():
+            samples.update(read_samples(path))
+    return samples
+
+
+def escape(value):
+    return (value.replace('\\', r'\\').replace('"', r'\"')
+            .replace('\n', r'\n'))
+
+
+def metric_name(sample):
+    for suffix in HISTOGRAM_SUFFIXES:
+        name = sample[:-len(suffix)]
+        if sample.endswith(suffix) and name in METRICS:
+            return name
+    return sample
+
+
+def sample_key(item):
+    (sample, labels), _ = item
+    labels = dict(labels)
+    bound = labels.pop('le', '+Inf')
+    return sample, sorted(labels.items()), float(bound)
+
+
+def exposition(samples):
+    """Render samples in the Prometheus text exposition format."""
+    lines = []
+    for name, (kind, help_text, _) in METRICS.items():
+        lines.append(f'# HELP {name} {help_text}')
+        lines.append(f'# TYPE {name} {kind}')
+        for (sample, labels), value in sorted(
+                samples.items(), key=sample_key):
+            if metric_name(sample) != name:
+                continue
+            if labels:
+                labels = ','.join(
+                    f'{label}="{escape(str(label_value))}"'
+                    for label, label_value in labels)
+                sample = f'{sample}{{{labels}}}'
+            lines.append(f'{sample} {value}')
+    return '\n'.join(lines) + '\n'
+
+
+metrics = Metrics()
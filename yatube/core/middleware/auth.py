@@ -0,0 +1,89 @@
+from django.conf import settings
+from django.contrib import auth
+from django.contrib.auth.middleware import AuthenticationMiddleware
+from django.core.cache import caches
+from django.core.cache.backends.dummy import DummyCache
+from django.core.cache.backends.locmem import LocMemCache
+from django.core.exceptions import ImproperlyConfigured
+from django.utils.crypto import constant_time_compare
+from django.utils.functional import SimpleLazyObject
+
+# Backends whose entries live in one process, other workers would not see
+# a user dropped on save or logout
+PROCESS_LOCAL_CACHES = (LocMemCache, DummyCache)
+
+
+def user_cache():
+    """Return the AUTH_USER_CACHE cache, None when users are not cached."""
+    if settings.AUTH_USER_CACHE is None:
+        return None
+    cache = caches[settings.AUTH_USER_CACHE]
+    if isinstance(cache, PROCESS_LOCAL_CACHES):
+        raise ImproperlyConfigured(
+            'AUTH_USER_CACHE must be a cache shared by all workers.')
+    return cache
+
+
+def user_cache_key(user_id):
+    return f'auth_user:{user_id}'
+
+
+def is_valid(request, user):
+    """Repeat the checks auth.get_user does on a user from the cache.
+
+    The backend of the session must still be configured and allow the
+    user, e.g. ModelBackend rejects inactive users, and the auth hash
+    stored in the session must match the one of the user, so a session
+    of an old password never matches.
+    """
+    backend_path = request.session.get(auth.BACKEND_SESSION_KEY)
+    if backend_path not in settings.AUTHENTICATION_BACKENDS:
+        return False
+    backend = auth.load_backend(backend_path)
+    can_authenticate = getattr(backend, 'user_can_authenticate', None)
+    if can_authenticate is not None and not can_authenticate(user):
+        return False
+    session_hash = request.session.get(auth.HASH_SESSION_KEY)
+    return bool(session_hash) and constant_time_compare(
+        session_hash, user.get_session_auth_hash())
+
+
+def load_user(request):
+    """Return the user of the session, from the cache when possible.
+
+    A cached user is only trusted when it passes the checks of
+    auth.get_user. Otherwise the user is loaded and verified by
+    auth.get_user.
+    """
+    cache = user_cache()
+    user_id = request.session.get(auth.SESSION_KEY)
+    if cache is None or user_id is None:
+        return auth.get_user(request)
+    key = user_cache_key(user_id)
+    user = cache.get(key)
+    if user is not None and is_valid(request, user):
+        return user
+    user = auth.get_user(request)
+    if user.is_authenticated:
+        cache.set(key, user, settings.AUTH_USER_CACHE_TIMEOUT)
+    return user
+
+
+def forget_user(user_id):
+    cache = user_cache()
+    if cache is not None:
+        cache.delete(user_cache_key(user_id))
+
+
+def get_user(request):
+    if not hasattr(request, '_cached_user'):
+        request._cached_user = load_user(request)
+    return request._cached_user
+
+
+class CachedAuthenticationMiddleware(AuthenticationMiddleware):
+    """AuthenticationMiddleware serving request.user from the cache."""
+
+    def process_request(self, request):
+        super().process_request(request)
+        request.user = SimpleLazyObject(lambda: get_user(request))
@@ -0,0 +1,71 @@
+import os
+import threading
+import tracemalloc
+from datetime import datetime
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+
+SNAPSHOT_FILTERS = (
+    tracemalloc.Filter(False, tracemalloc.__file__),
+    tracemalloc.Filter(False, '<frozen importlib._bootstrap>'),
+    tracemalloc.Filter(False, '<unknown>'),
+)
+
+
+def snapshot_path(view_name, stamp):
+    name = f'{view_name.replace(":", "-")}-{stamp}.snapshot'
+    return os.path.join(settings.MEMORY_PROFILE_DIR, name)
+
+
+class MemoryProfileMiddleware:
+    """Trace allocations of requests of staff asking for it by header.
+
+    Enabled by settings.MEMORY_PROFILING. The peak and the top allocation
+    sites of the request are returned in X-Memory-* headers, the snapshot
+    is dumped to MEMORY_PROFILE_DIR for compare_memory_snapshots. Tracing
+    is process wide, so only one request is profiled at a time.
+    """
+
+    lock = threading.Lock()
+
+    def __init__(self, get_response):
+        if not settings.MEMORY_PROFILING:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if not (request.META.get(settings.MEMORY_PROFILE_HEADER)
+                and request.user.is_staff):
+            return self.get_response(request)
+        if not self.lock.acquire(blocking=False):
+            return self.get_response(request)
+        try:
+            return self.profile(request)
+        finally:
+            self.lock.release()
+
+    def profile(self, request):
+        tracemalloc.start(settings.MEMORY_PROFILE_FRAMES)
+        try:
+            before = tracemalloc.take_snapshot()
+            response = self.get_response(request)
+            after = tracemalloc.take_snapshot()
+            peak = tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+        after = after.filter_traces(SNAPSHOT_FILTERS)
+        top = after.compare_to(
+            before.filter_traces(SNAPSHOT_FILTERS), 'lineno')
+        response['X-Memory-Peak'] = str(peak)
+        response['X-Memory-Top'] = '; '.join(
+            f'{stat.traceback[0].filename}:{stat.traceback[0].lineno}'
+            f'={stat.size_diff:+d}'
+            for stat in top[:settings.MEMORY_PROFILE_TOP]
+        )
+        match = request.resolver_match
+        if match is not None:
+            os.makedirs(settings.MEMORY_PROFILE_DIR, exist_ok=True)
+            stamp = datetime.now().strftime('%Y%m%d-%H%M%S-%f')
+            after.dump(snapshot_path(match.view_name, stamp))
+        return response
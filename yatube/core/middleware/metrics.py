@@ -0,0 +1,52 @@
+import time
+
+from django.db import connection
+
+from core.metrics import metrics
+
+
+def view_name(request):
+    match = request.resolver_match
+    return match.view_name if match else 'unresolved'
+
+
+class QueryMetrics:
+    """Execute wrapper observing the queries of a request."""
+
+    def __init__(self, request):
+        self.request = request
+        self.count = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.count += 1
+            metrics.observe(
+                'yatube_db_query_duration_seconds',
+                (('view', view_name(self.request)),),
+                time.perf_counter() - started,
+            )
+
+
+class MetricsMiddleware:
+    """Record request and query metrics served by the metrics view."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        queries = QueryMetrics(request)
+        started = time.perf_counter()
+        with connection.execute_wrapper(queries):
+            response = self.get_response(request)
+        duration = time.perf_counter() - started
+        view = view_name(request)
+        labels = (('view', view), ('status', str(response.status_code)))
+        metrics.inc('yatube_requests_total', labels)
+        metrics.observe('yatube_request_duration_seconds', labels, duration)
+        metrics.observe(
+            'yatube_db_queries_per_request', (('view', view),), queries.count)
+        metrics.flush_if_due()
+        return response
@@ -0,0 +1,83 @@
+import cProfile
+import glob
+import os
+import threading
+from datetime import datetime
+
+from django.conf import settings
+from django.core import signing
+from django.core.exceptions import MiddlewareNotUsed
+
+SALT = 'core.middleware.profile'
+
+
+def profile_token(user):
+    """Return the token that lets the user profile requests for a while."""
+    return signing.TimestampSigner(salt=SALT).sign(str(user.pk))
+
+
+def valid_token(token, user):
+    try:
+        user_pk = signing.TimestampSigner(salt=SALT).unsign(
+            token, max_age=settings.REQUEST_PROFILE_TOKEN_MAX_AGE)
+    except signing.BadSignature:
+        return False
+    return user_pk == str(user.pk)
+
+
+class RequestProfileMiddleware:
+    """Run requests of staff under cProfile on demand.
+
+    Enabled by settings.REQUEST_PROFILING. A request is profiled when it
+    carries a profile_token() of its staff user in the X-Profile header or
+    the `profile` query parameter; the stats are written to
+    REQUEST_PROFILE_DIR as <url name>-<timestamp>.prof and only the newest
+    REQUEST_PROFILE_KEEP files are kept. Other requests only pay for the
+    header and parameter lookups.
+    """
+
+    lock = threading.Lock()
+
+    def __init__(self, get_response):
+        if not settings.REQUEST_PROFILING:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        token = (request.META.get('HTTP_X_PROFILE')
+                 or request.GET.get('profile'))
+        if not token or not request.user.is_staff:
+            return self.get_response(request)
+        if not valid_token(token, request.user):
+            return self.get_response(request)
+        if not self.lock.acquire(blocking=False):
+            return self.get_response(request)
+        try:
+            return self.profile(request)
+        finally:
+            self.lock.release()
+
+    def profile(self, request):
+        profiler = cProfile.Profile()
+        response = profiler.runcall(self.get_response, request)
+        match = request.resolver_match
+        if match is None:
+            return response
+        os.makedirs(settings.REQUEST_PROFILE_DIR, exist_ok=True)
+        name = '{}-{}.prof'.format(
+            match.view_name.replace(':', '-'),
+            datetime.now().strftime('%Y%m%d-%H%M%S-%f'),
+        )
+        profiler.dump_stats(os.path.join(settings.REQUEST_PROFILE_DIR, name))
+        response['X-Profile-File'] = name
+        self.prune()
+        return response
+
+    @staticmethod
+    def prune():
+        dumps = sorted(
+            glob.glob(os.path.join(settings.REQUEST_PROFILE_DIR, '*.prof')),
+            key=os.path.getmtime,
+        )
+        for path in dumps[:-settings.REQUEST_PROFILE_KEEP]:
+            os.remove(path)
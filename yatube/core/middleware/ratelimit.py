@@ -0,0 +1,99 @@
+import math
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.exceptions import ImproperlyConfigured
+from django.http import HttpResponse
+
+from .auth import PROCESS_LOCAL_CACHES
+
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS', 'TRACE')
+
+
+def limit_cache():
+    """Return the RATE_LIMIT_CACHE cache, None when writes are not limited.
+
+    With a cache of one process every worker would count its own bucket
+    and let rate times the number of workers requests through.
+    """
+    if settings.RATE_LIMIT_CACHE is None:
+        return None
+    cache = caches[settings.RATE_LIMIT_CACHE]
+    if isinstance(cache, PROCESS_LOCAL_CACHES):
+        raise ImproperlyConfigured(
+            'RATE_LIMIT_CACHE must be a cache shared by all workers.')
+    return cache
+
+
+def client_ip(request):
+    """Address of the client, read behind RATE_LIMIT_TRUSTED_PROXIES.
+
+    X-Forwarded-For is trusted only when the request comes from one of
+    the proxies, and only up to the first address not among them: a
+    client can put anything at the start of the header.
+    """
+    address = request.META.get('REMOTE_ADDR')
+    trusted = settings.RATE_LIMIT_TRUSTED_PROXIES
+    if address not in trusted:
+        return address
+    forwarded = request.META.get('HTTP_X_FORWARDED_FOR', '')
+    for hop in reversed([hop.strip() for hop in forwarded.split(',')]):
+        if hop and hop not in trusted:
+            return hop
+    return address
+
+
+class RateLimitMiddleware:
+    """Limit writes to the views listed in settings.RATE_LIMITS.
+
+    Every user and every client address gets a bucket of `rate` requests
+    that is refilled at the start of each `period` seconds. Buckets are
+    counters in the RATE_LIMIT_CACHE cache changed only with atomic
+    add/incr, so the limit holds across worker processes sharing that
+    cache. Reads return before any cache access.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        return self.get_response(request)
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        if request.method in SAFE_METHODS:
+            return None
+        view_name = request.resolver_match.view_name
+        limit = settings.RATE_LIMITS.get(view_name)
+        if limit is None:
+            return None
+        cache = limit_cache()
+        if cache is None:
+            return None
+        scopes = [f'ip:{client_ip(request)}']
+        if request.user.is_authenticated:
+            scopes.append(f'user:{request.user.pk}')
+        now = time.time()
+        window = int(now // limit['period'])
+        for scope in scopes:
+            key = f'ratelimit:{view_name}:{scope}:{window}'
+            if self.take(cache, key, limit['period']) > limit['rate']:
+                retry_after = (window + 1) * limit['period'] - now
+                return self.too_many_requests(math.ceil(retry_after))
+        return None
+
+    def take(self, cache, key, period):
+        """Take a token from the bucket, return the number taken so far."""
+        cache.add(key, 0, period)
+        try:
+            return cache.incr(key)
+        except ValueError:
+            # The bucket expired between add and incr
+            cache.add(key, 1, period)
+            return 1
+
+    def too_many_requests(self, retry_after):
+        response = HttpResponse(
+            'Слишком много запросов, попробуйте позже', status=429)
+        response['Retry-After'] = str(retry_after)
+        return response
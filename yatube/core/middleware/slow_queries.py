@@ -0,0 +1,21 @@
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connection
+
+from core.slow_queries import SlowQueryLogger
+
+
+class SlowQueryMiddleware:
+    """Log slow queries of requests, see core.slow_queries.
+
+    Disabled when settings.SLOW_QUERY_THRESHOLD is None.
+    """
+
+    def __init__(self, get_response):
+        if settings.SLOW_QUERY_THRESHOLD is None:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        with connection.execute_wrapper(SlowQueryLogger(request)):
+            return self.get_response(request)
@@ -0,0 +1,31 @@
+import random
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connection
+
+from core import timing
+
+
+class ServerTimingMiddleware:
+    """Add a Server-Timing header with the breakdown of request time.
+
+    Sampled requests report time spent in SQL (`db`), template rendering
+    (`tpl`), context processors (`ctx`) and everything else (`app`),
+    each with the number of calls as the description. The share of
+    sampled requests is settings.SERVER_TIMING_SAMPLE_RATE.
+    """
+
+    def __init__(self, get_response):
+        if not settings.SERVER_TIMING_SAMPLE_RATE:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if random.random() >= settings.SERVER_TIMING_SAMPLE_RATE:
+            return self.get_response(request)
+        with timing.collect() as timings:
+            with connection.execute_wrapper(timing.sql):
+                response = self.get_response(request)
+        response['Server-Timing'] = timings.header()
+        return response
@@ -0,0 +1,20 @@
+from django.db import models
+
+
+class OutboxMessage(models.Model):
+    """Email waiting in the outbox to be delivered by send_outbox."""
+    payload = models.TextField('Письмо в формате JSON')
+    created = models.DateTimeField(auto_now_add=True)
+    attempts = models.PositiveIntegerField(default=0)
+    next_attempt_at = models.DateTimeField(
+        null=True,
+        db_index=True,
+        help_text='Пусто, если попытки отправки исчерпаны',
+    )
+    last_error = models.TextField(blank=True)
+
+    def __str__(self):
+        return f'Письмо #{self.pk}'
+
+    class Meta:
+        ordering = ['next_attempt_at']
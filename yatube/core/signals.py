@@ -0,0 +1,20 @@
+from django.contrib.auth import get_user_model
+from django.contrib.auth.signals import user_logged_out
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .middleware.auth import forget_user
+
+User = get_user_model()
+
+
+@receiver([post_save, post_delete], sender=User)
+def forget_saved_user(sender, instance, **kwargs):
+    """Changed user, e.g. with a new password, is loaded again."""
+    forget_user(instance.pk)
+
+
+@receiver(user_logged_out)
+def forget_logged_out_user(sender, user, **kwargs):
+    if user is not None:
+        forget_user(user.pk)
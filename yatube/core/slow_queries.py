@@ -0,0 +1,71 @@
+import json
+import logging
+import re
+import time
+
+from django.conf import settings
+from django.db import DatabaseError
+from django.utils import timezone
+
+logger = logging.getLogger('yatube.slow_queries')
+
+FINGERPRINT_RULES = (
+    (re.compile(r"'(?:[^']|'')*'"), '?'),
+    (re.compile(r'\b\d+(?:\.\d+)?\b'), '?'),
+    (re.compile(r'%s'), '?'),
+    (re.compile(r'\(\s*\?(?:\s*,\s*\?)+\s*\)'), '(?, ...)'),
+    (re.compile(r'\s+'), ' '),
+)
+
+
+def fingerprint(sql):
+    """Return the query with literals and placeholder lists normalized."""
+    for pattern, replacement in FINGERPRINT_RULES:
+        sql = pattern.sub(replacement, sql)
+    return sql.strip()
+
+
+def explain(connection, sql, params):
+    """Return the plan of the query or None if it can not be explained."""
+    prefix = connection.ops.explain_query_prefix()
+    try:
+        with connection.cursor() as cursor:
+            # The inner cursor skips execute wrappers, this one included
+            cursor.cursor.execute(f'{prefix} {sql}', params)
+            return [str(row[-1]) for row in cursor.fetchall()]
+    except DatabaseError:
+        return None
+
+
+class SlowQueryLogger:
+    """Execute wrapper logging queries slower than SLOW_QUERY_THRESHOLD.
+
+    An entry is a JSON line with the view, the duration in seconds, the
+    SQL with its parameters and, for a SELECT, the plan explained on the
+    same connection right after the query.
+    """
+
+    def __init__(self, request):
+        self.request = request
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        result = execute(sql, params, many, context)
+        duration = time.perf_counter() - started
+        if duration >= settings.SLOW_QUERY_THRESHOLD:
+            self.log(context['connection'], sql, params, many, duration)
+        return result
+
+    def log(self, connection, sql, params, many, duration):
+        plan = None
+        if not many and sql.lstrip()[:6].upper() == 'SELECT':
+            plan = explain(connection, sql, params)
+        match = self.request.resolver_match
+        logger.warning(json.dumps({
+            'time': timezone.now().isoformat(),
+            'view': match.view_name if match else None,
+            'duration': round(duration, 6),
+            'sql': sql,
+            'params': None if many else params,
+            'plan': plan,
+        }, default=str, ensure_ascii=False))
@@ -0,0 +1,37 @@
+"""Settings of the whole test run, for manage.py test and pytest."""
+import os
+import tempfile
+from contextlib import contextmanager
+
+from django.test.runner import DiscoverRunner
+from django.test.utils import override_settings
+
+
+@contextmanager
+def test_environment():
+    """Override settings that would leak state out of a test.
+
+    Uploads, thumbnails and metrics go to a temporary directory removed
+    after the run, and thumbnails are made in the test process rather than by a
+    pool of workers. Every view hit is flushed right away, so no buffered
+    views of one test are written during another.
+    """
+    with tempfile.TemporaryDirectory(prefix='yatube-tests-') as root:
+        with override_settings(
+            MEDIA_ROOT=os.path.join(root, 'media'),
+            METRICS_DIR=os.path.join(root, 'metrics'),
+            POST_THUMBNAIL_WORKERS=0,
+            VIEW_COUNTER_FLUSH_SIZE=1,
+        ):
+            yield
+
+
+class TestRunner(DiscoverRunner):
+    def setup_test_environment(self, **kwargs):
+        super().setup_test_environment(**kwargs)
+        self.environment = test_environment()
+        self.environment.__enter__()
+
+    def teardown_test_environment(self, **kwargs):
+        self.environment.__exit__(None, None, None)
+        super().teardown_test_environment(**kwargs)
@@ -0,0 +1,110 @@
+import shutil
+import tempfile
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import caches
+from django.core.exceptions import ImproperlyConfigured
+from django.db import connection
+from django.test import Client, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from core.apps import check_session_cache
+
+User = get_user_model()
+
+INDEX_URL = reverse('posts:index')
+
+
+class CachedUserTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        # A file cache is shared by processes like memcached would be
+        cls.cache_dir = tempfile.mkdtemp()
+        cls.shared_cache = override_settings(
+            CACHES={**settings.CACHES, 'users': {
+                'BACKEND': (
+                    'django.core.cache.backends.filebased.FileBasedCache'),
+                'LOCATION': cls.cache_dir,
+            }},
+            AUTH_USER_CACHE='users',
+        )
+        cls.shared_cache.enable()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.shared_cache.disable()
+        shutil.rmtree(cls.cache_dir, ignore_errors=True)
+        super().tearDownClass()
+
+    def setUp(self):
+        caches['users'].clear()
+        self.user = User.objects.create_user(
+            username='cached', password='old-password')
+        self.authorized_client = Client()
+        self.authorized_client.login(
+            username='cached', password='old-password')
+
+    def user_queries(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.authorized_client.get(INDEX_URL)
+        return response, [
+            query for query in queries if 'auth_user' in query['sql']
+            and 'posts_post' not in query['sql']
+        ]
+
+    def test_user_is_loaded_once(self):
+        """Second page view gets the user without a query."""
+        self.user_queries()
+        response, queries = self.user_queries()
+        self.assertEqual(queries, [])
+        self.assertEqual(response.context['user'], self.user)
+
+    def test_password_change_logs_old_session_out(self):
+        """Session of the old password does not match the cached user."""
+        self.user_queries()
+        self.user.set_password('new-password')
+        self.user.save()
+        response, _ = self.user_queries()
+        self.assertFalse(response.context['user'].is_authenticated)
+
+    def test_user_save_refreshes_cache(self):
+        self.user_queries()
+        self.user.first_name = 'Renamed'
+        self.user.save()
+        response, _ = self.user_queries()
+        self.assertEqual(response.context['user'].first_name, 'Renamed')
+
+    def test_deactivated_user_is_not_served_from_cache(self):
+        """Cached entries pass the checks of auth.get_user as well."""
+        self.user_queries()
+        User.objects.filter(pk=self.user.pk).update(is_active=False)
+        cached = caches['users'].get(f'auth_user:{self.user.pk}')
+        cached.is_active = False
+        caches['users'].set(f'auth_user:{self.user.pk}', cached)
+        response, _ = self.user_queries()
+        self.assertFalse(response.context['user'].is_authenticated)
+
+    def test_process_local_cache_is_rejected(self):
+        with self.settings(AUTH_USER_CACHE='default'):
+            with self.assertRaises(ImproperlyConfigured):
+                self.authorized_client.get(INDEX_URL)
+
+    def test_users_are_not_cached_by_default(self):
+        with self.settings(AUTH_USER_CACHE=None):
+            self.user_queries()
+            _, queries = self.user_queries()
+        self.assertEqual(len(queries), 1)
+
+
+class SessionCacheTests(TestCase):
+    @override_settings(
+        SESSION_ENGINE='django.contrib.sessions.backends.cached_db')
+    def test_process_local_session_cache_is_rejected(self):
+        with self.assertRaises(ImproperlyConfigured):
+            check_session_cache()
+
+    def test_database_sessions_need_no_cache(self):
+        check_session_cache()
@@ -0,0 +1,33 @@
+from django.test import SimpleTestCase
+
+from ..loaders import minify
+
+
+class MinifyTests(SimpleTestCase):
+    def test_indentation_and_comments_are_dropped(self):
+        source = (
+            '<ul>\n'
+            '    {% comment %} список {% endcomment %}\n'
+            '    <li>{{ a }} {# note #}</li>\n'
+            '\n'
+            '    <li>{{ b }}</li>\n'
+            '</ul>\n'
+        )
+        self.assertEqual(
+            minify(source),
+            '<ul>\n<li>{{ a }} </li>\n<li>{{ b }}</li>\n</ul>\n')
+
+    def test_pre_and_textarea_are_kept(self):
+        source = (
+            '<div>\n  <pre>\n  code\n    indented\n</pre>\n'
+            '  <textarea>\n  text\n</textarea>\n</div>'
+        )
+        self.assertEqual(
+            minify(source),
+            '<div>\n<pre>\n  code\n    indented\n</pre>\n'
+            '<textarea>\n  text\n</textarea>\n</div>')
+
+    def test_stray_comment_opening_does_not_span_lines(self):
+        """Only a {# #} on one line is a comment, like Django parses it."""
+        source = '<p>{# text</p>\n<p>more #}</p>\n'
+        self.assertEqual(minify(source), source)
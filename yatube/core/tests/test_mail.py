@@ -0,0 +1,84 @@
+from datetime import timedelta
+from email.mime.base import MIMEBase
+from io import StringIO
+
+from django.core import mail
+from django.core.mail.backends.base import BaseEmailBackend
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from ..management.commands.send_outbox import Command as SendOutbox
+from ..models import OutboxMessage
+
+OUTBOX_BACKEND = 'core.mail.OutboxEmailBackend'
+LOCMEM_BACKEND = 'django.core.mail.backends.locmem.EmailBackend'
+
+
+class BrokenEmailBackend(BaseEmailBackend):
+    """Stand-in for an unreachable mail server."""
+
+    def send_messages(self, email_messages):
+        raise ConnectionRefusedError('Mail server is down')
+
+
+@override_settings(EMAIL_BACKEND=OUTBOX_BACKEND,
+                   OUTBOX_EMAIL_BACKEND=LOCMEM_BACKEND)
+class OutboxTests(TestCase):
+    def send(self):
+        mail.send_mail('Subject', 'Body', 'from@example.com',
+                       ['to@example.com'])
+
+    def test_send_mail_only_queues_message(self):
+        """Sending puts the message into the outbox."""
+        self.send()
+        self.assertEqual(OutboxMessage.objects.count(), 1)
+        self.assertEqual(len(mail.outbox), 0)
+
+    def test_send_outbox_delivers_and_empties_outbox(self):
+        """Worker delivers queued messages as they were sent."""
+        self.send()
+        call_command('send_outbox', '--once', stdout=StringIO())
+        self.assertFalse(OutboxMessage.objects.exists())
+        self.assertEqual(len(mail.outbox), 1)
+        self.assertEqual(mail.outbox[0].subject, 'Subject')
+        self.assertEqual(mail.outbox[0].to, ['to@example.com'])
+
+    @override_settings(
+        OUTBOX_EMAIL_BACKEND='core.tests.test_mail.BrokenEmailBackend',
+        OUTBOX_MAX_ATTEMPTS=2)
+    def test_failed_delivery_is_retried_with_backoff(self):
+        """Failed message stays in the outbox until attempts run out."""
+        self.send()
+        call_command('send_outbox', '--once', stdout=StringIO())
+        message = OutboxMessage.objects.get()
+        self.assertEqual(message.attempts, 1)
+        self.assertGreater(message.next_attempt_at, timezone.now())
+        message.next_attempt_at = timezone.now() - timedelta(seconds=1)
+        message.save()
+        call_command('send_outbox', '--once', stdout=StringIO())
+        message.refresh_from_db()
+        self.assertEqual(message.attempts, 2)
+        self.assertIsNone(message.next_attempt_at)
+
+    def test_claimed_messages_are_not_claimed_again(self):
+        """A second worker does not get messages leased by the first."""
+        self.send()
+        self.assertEqual(len(SendOutbox().claim(10)), 1)
+        self.assertEqual(SendOutbox().claim(10), [])
+
+    def test_mime_attachment_is_delivered(self):
+        """Ready MIME parts survive the trip through the outbox."""
+        part = MIMEBase('application', 'octet-stream')
+        part.set_payload('payload')
+        part.add_header('Content-Disposition', 'attachment',
+                        filename='data.bin')
+        message = mail.EmailMessage(
+            'Subject', 'Body', 'from@example.com', ['to@example.com'])
+        message.attach(part)
+        message.send()
+        call_command('send_outbox', '--once', stdout=StringIO())
+        attachment = mail.outbox[0].attachments[0]
+        self.assertIsInstance(attachment, MIMEBase)
+        self.assertEqual(attachment.get_filename(), 'data.bin')
+        self.assertEqual(attachment.get_payload(), 'payload')
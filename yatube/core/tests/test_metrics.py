@@ -0,0 +1,70 @@
+import json
+import os
+import re
+import subprocess
+import sys
+
+from django.conf import settings
+from django.core.cache import cache
+from django.test import TestCase
+from django.urls import reverse
+
+INDEX_URL = reverse('posts:index')
+METRICS_URL = reverse('metrics')
+
+SAMPLE = re.compile(r'^(\w+(?:\{.*\})?) (\S+)$', re.MULTILINE)
+INDEX_REQUESTS = 'yatube_requests_total{view="posts:index",status="200"}'
+
+
+WORKER = [['yatube_requests_total',
+           [['view', 'posts:index'], ['status', '200']], 5]]
+
+
+class MetricsTests(TestCase):
+    def scrape(self):
+        response = self.client.get(METRICS_URL)
+        self.assertTrue(response['Content-Type'].startswith('text/plain'))
+        return {sample: float(value) for sample, value
+                in SAMPLE.findall(response.content.decode())}
+
+    def test_requests_are_reported(self):
+        before = self.scrape().get(INDEX_REQUESTS, 0)
+        self.client.get(INDEX_URL)
+        # Anonymous pages do not touch the cache, look a key up directly
+        cache.get('missing')
+        samples = self.scrape()
+        self.assertEqual(samples[INDEX_REQUESTS], before + 1)
+        for name in (
+            'yatube_request_duration_seconds_bucket{view="posts:index",'
+            'status="200",le="+Inf"}',
+            'yatube_db_query_duration_seconds_count{view="posts:index"}',
+            'yatube_db_queries_per_request_sum{view="posts:index"}',
+            'yatube_cache_requests_total{result="miss"}',
+            'yatube_template_render_seconds_count'
+            '{template="posts/index.html"}',
+        ):
+            self.assertIn(name, samples)
+
+    def write_worker(self, pid):
+        os.makedirs(settings.METRICS_DIR, exist_ok=True)
+        path = os.path.join(settings.METRICS_DIR, f'{pid}-0.json')
+        with open(path, 'w') as spool:
+            json.dump(WORKER, spool)
+        return path
+
+    def test_workers_are_summed(self):
+        before = self.scrape().get(INDEX_REQUESTS, 0)
+        path = self.write_worker(os.getpid())
+        self.addCleanup(os.remove, path)
+        self.assertEqual(self.scrape()[INDEX_REQUESTS], before + 5)
+
+    def test_exited_workers_are_kept(self):
+        """Counts of an exited worker stay after its file is folded."""
+        before = self.scrape().get(INDEX_REQUESTS, 0)
+        worker = subprocess.run(
+            [sys.executable, '-c', 'import os; print(os.getpid())'],
+            capture_output=True, check=True)
+        path = self.write_worker(int(worker.stdout))
+        self.assertEqual(self.scrape()[INDEX_REQUESTS], before + 5)
+        self.assertFalse(os.path.exists(path))
+        self.assertEqual(self.scrape()[INDEX_REQUESTS], before + 5)
@@ -0,0 +1,95 @@
+import glob
+import os
+import pstats
+import shutil
+import tempfile
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from core.middleware.profile import profile_token
+
+User = get_user_model()
+
+INDEX_URL = reverse('posts:index')
+PROFILE_DIR = tempfile.mkdtemp()
+
+
+@override_settings(MEMORY_PROFILING=True, MEMORY_PROFILE_DIR=PROFILE_DIR)
+class MemoryProfileTests(TestCase):
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(PROFILE_DIR, ignore_errors=True)
+
+    def setUp(self):
+        self.staff_client = Client()
+        self.staff_client.force_login(User.objects.create_user(
+            username='staff', is_staff=True))
+
+    def test_staff_request_with_header_is_profiled(self):
+        response = self.staff_client.get(
+            INDEX_URL, HTTP_X_PROFILE_MEMORY='1')
+        self.assertGreater(int(response['X-Memory-Peak']), 0)
+        self.assertIn('X-Memory-Top', response)
+        self.staff_client.get(reverse('about:author'),
+                              HTTP_X_PROFILE_MEMORY='1')
+        out = StringIO()
+        call_command('compare_memory_snapshots', 'about:author',
+                     'posts:index', stdout=out)
+        self.assertIn('Total difference', out.getvalue())
+
+    def test_other_requests_are_not_profiled(self):
+        """Header of an anonymous user and staff without it are ignored."""
+        self.assertNotIn(
+            'X-Memory-Peak',
+            self.client.get(INDEX_URL, HTTP_X_PROFILE_MEMORY='1'))
+        self.assertNotIn('X-Memory-Peak', self.staff_client.get(INDEX_URL))
+
+    def test_snapshots_of_one_second_are_kept(self):
+        with tempfile.TemporaryDirectory() as profile_dir:
+            with self.settings(MEMORY_PROFILE_DIR=profile_dir):
+                for _ in range(2):
+                    self.staff_client.get(
+                        INDEX_URL, HTTP_X_PROFILE_MEMORY='1')
+            self.assertEqual(len(os.listdir(profile_dir)), 2)
+
+
+@override_settings(REQUEST_PROFILING=True, REQUEST_PROFILE_DIR=PROFILE_DIR,
+                   REQUEST_PROFILE_KEEP=2)
+class RequestProfileTests(TestCase):
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(PROFILE_DIR, ignore_errors=True)
+
+    def setUp(self):
+        self.staff = User.objects.create_user(username='staff', is_staff=True)
+        self.staff_client = Client()
+        self.staff_client.force_login(self.staff)
+
+    def test_signed_request_is_profiled(self):
+        token = profile_token(self.staff)
+        response = self.staff_client.get(INDEX_URL, HTTP_X_PROFILE=token)
+        self.assertTrue(response['X-Profile-File'].startswith('posts-index-'))
+        response = self.staff_client.get(INDEX_URL, {'profile': token})
+        path = os.path.join(PROFILE_DIR, response['X-Profile-File'])
+        self.assertGreater(pstats.Stats(path).total_calls, 0)
+
+    def test_old_profiles_are_removed(self):
+        token = profile_token(self.staff)
+        for _ in range(4):
+            self.staff_client.get(INDEX_URL, HTTP_X_PROFILE=token)
+        self.assertEqual(
+            len(glob.glob(os.path.join(PROFILE_DIR, '*.prof'))), 2)
+
+    def test_unsigned_requests_are_not_profiled(self):
+        user = User.objects.create_user(username='user')
+        self.client.force_login(user)
+        self.assertNotIn('X-Profile-File', self.client.get(
+            INDEX_URL, HTTP_X_PROFILE=profile_token(user)))
+        self.assertNotIn('X-Profile-File', self.staff_client.get(
+            INDEX_URL, HTTP_X_PROFILE=profile_token(self.staff) + 'x'))
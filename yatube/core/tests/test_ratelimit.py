@@ -0,0 +1,93 @@
+import shutil
+import tempfile
+from http import HTTPStatus
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import caches
+from django.core.exceptions import ImproperlyConfigured
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+User = get_user_model()
+
+POST_CREATE_URL = reverse('posts:post_create')
+PROXY = '10.0.0.1'
+
+
+@override_settings(RATE_LIMITS={
+    'posts:post_create': {'rate': 2, 'period': 60},
+})
+class RateLimitTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        # A file cache is shared by processes like memcached would be
+        cls.cache_dir = tempfile.mkdtemp()
+        cls.shared_cache = override_settings(
+            CACHES={**settings.CACHES, 'ratelimit': {
+                'BACKEND': (
+                    'django.core.cache.backends.filebased.FileBasedCache'),
+                'LOCATION': cls.cache_dir,
+            }},
+            RATE_LIMIT_CACHE='ratelimit',
+            RATE_LIMIT_TRUSTED_PROXIES=[PROXY],
+        )
+        cls.shared_cache.enable()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.shared_cache.disable()
+        shutil.rmtree(cls.cache_dir, ignore_errors=True)
+        super().tearDownClass()
+
+    def setUp(self):
+        caches['ratelimit'].clear()
+        self.user = User.objects.create_user(username='writer')
+        self.authorized_client = Client()
+        self.authorized_client.force_login(self.user)
+
+    def test_writes_over_limit_get_429(self):
+        """Third write within the period is refused with Retry-After."""
+        for i in range(2):
+            response = self.authorized_client.post(
+                POST_CREATE_URL, {'text': f'Post {i}'})
+            self.assertEqual(response.status_code, HTTPStatus.FOUND)
+        response = self.authorized_client.post(
+            POST_CREATE_URL, {'text': 'One more post'})
+        self.assertEqual(response.status_code, HTTPStatus.TOO_MANY_REQUESTS)
+        self.assertTrue(0 < int(response['Retry-After']) <= 60)
+
+    def test_reads_are_not_limited(self):
+        """Reads of a limited view never count against the limit."""
+        for _ in range(5):
+            response = self.authorized_client.get(POST_CREATE_URL)
+            self.assertEqual(response.status_code, HTTPStatus.OK)
+
+    def test_clients_behind_proxy_have_own_buckets(self):
+        """Clients are told apart by X-Forwarded-For of a trusted proxy."""
+        for i in range(3):
+            client = Client(REMOTE_ADDR=PROXY)
+            client.force_login(User.objects.create_user(username=f'u{i}'))
+            response = client.post(
+                POST_CREATE_URL, {'text': f'Post {i}'},
+                HTTP_X_FORWARDED_FOR=f'1.2.3.4, 10.0.1.{i}')
+            self.assertEqual(response.status_code, HTTPStatus.FOUND)
+
+    def test_forwarded_for_is_ignored_from_clients(self):
+        """A client can not pick its address by sending the header."""
+        for i in range(2):
+            self.authorized_client.post(
+                POST_CREATE_URL, {'text': f'Post {i}'},
+                HTTP_X_FORWARDED_FOR=f'10.0.1.{i}')
+        other = Client()
+        other.force_login(User.objects.create_user(username='other'))
+        response = other.post(
+            POST_CREATE_URL, {'text': 'Other post'},
+            HTTP_X_FORWARDED_FOR='10.0.1.9')
+        self.assertEqual(response.status_code, HTTPStatus.TOO_MANY_REQUESTS)
+
+    @override_settings(RATE_LIMIT_CACHE='default')
+    def test_process_local_cache_is_rejected(self):
+        with self.assertRaises(ImproperlyConfigured):
+            self.authorized_client.post(POST_CREATE_URL, {'text': 'Post'})
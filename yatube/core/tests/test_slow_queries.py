@@ -0,0 +1,53 @@
+import json
+import os
+import tempfile
+from io import StringIO
+
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from core.slow_queries import fingerprint
+
+INDEX_URL = reverse('posts:index')
+
+
+class SlowQueryLogTests(TestCase):
+    @override_settings(SLOW_QUERY_THRESHOLD=0)
+    def test_slow_queries_are_logged_with_plan(self):
+        with self.assertLogs('yatube.slow_queries') as logs:
+            self.client.get(INDEX_URL)
+        entries = [json.loads(record.getMessage())
+                   for record in logs.records]
+        selects = [entry for entry in entries
+                   if entry['view'] == 'posts:index'
+                   and entry['sql'].startswith('SELECT')]
+        self.assertTrue(selects)
+        self.assertTrue(all(entry['plan'] for entry in selects))
+
+    def test_fingerprint_ignores_literals(self):
+        self.assertEqual(
+            fingerprint('SELECT * FROM t WHERE id IN (%s, %s) AND x = %s'),
+            fingerprint("SELECT *  FROM t WHERE id IN (1, 2, 3) AND x = 'a'"),
+        )
+
+    def test_summary_orders_by_total_time(self):
+        entries = [
+            {'sql': 'SELECT a FROM t WHERE id = 1', 'duration': 0.2,
+             'view': 'posts:index', 'plan': ['SCAN t']},
+            {'sql': 'SELECT a FROM t WHERE id = 2', 'duration': 0.3,
+             'view': 'posts:profile', 'plan': None},
+            {'sql': 'SELECT b FROM t', 'duration': 0.4,
+             'view': None, 'plan': None},
+        ]
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'slow.log')
+            with open(path, 'w') as log:
+                log.writelines(json.dumps(entry) + '\n' for entry in entries)
+            out = StringIO()
+            call_command('slow_queries', log=path, stdout=out)
+        output = out.getvalue()
+        self.assertIn('2 queries, total 0.500s', output)
+        self.assertIn('SCAN t', output)
+        self.assertLess(output.index('SELECT a FROM t WHERE id = ?'),
+                        output.index('SELECT b FROM t'))
@@ -0,0 +1,31 @@
+import re
+
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from core import timing
+
+INDEX_URL = reverse('posts:index')
+
+
+class ServerTimingTests(TestCase):
+    @override_settings(SERVER_TIMING_SAMPLE_RATE=1)
+    def test_sampled_response_has_breakdown(self):
+        header = self.client.get(INDEX_URL)['Server-Timing']
+        names = re.findall(r'(\w+);dur=[\d.]+;desc="\d+"', header)
+        self.assertCountEqual(names, ['app', 'db', 'tpl', 'ctx'])
+
+    @override_settings(SERVER_TIMING_SAMPLE_RATE=0)
+    def test_disabled_sampling_skips_header(self):
+        self.assertNotIn('Server-Timing', self.client.get(INDEX_URL))
+
+    def test_nested_parts_are_exclusive(self):
+        with timing.collect() as timings:
+            with timing.measure('tpl'):
+                with timing.measure('db'):
+                    pass
+                with timing.measure('db'):
+                    pass
+        self.assertEqual(timings.counts['db'], 2)
+        self.assertEqual(timings.counts['tpl'], 1)
+        self.assertEqual(timings.stack, [])
@@ -0,0 +1,119 @@
+import threading
+import time
+from collections import Counter, defaultdict
+from contextlib import contextmanager
+from functools import wraps
+
+from django.template.backends.django import DjangoTemplates, Template
+
+from core.metrics import metrics
+
+_local = threading.local()
+
+
+class Timings:
+    """Exclusive time spent in named parts of a request.
+
+    Parts nest: while a query runs inside template rendering, the time is
+    counted to `db` only, so the parts add up to the measured total.
+    """
+
+    def __init__(self):
+        self.durations = defaultdict(float)
+        self.counts = Counter()
+        self.stack = []
+
+    @contextmanager
+    def measure(self, name):
+        now = time.perf_counter()
+        if self.stack:
+            outer, since = self.stack[-1]
+            self.durations[outer] += now - since
+        self.stack.append([name, now])
+        try:
+            yield
+        finally:
+            now = time.perf_counter()
+            self.durations[name] += now - self.stack.pop()[1]
+            self.counts[name] += 1
+            if self.stack:
+                self.stack[-1][1] = now
+
+    def header(self):
+        """Return the value of the Server-Timing header."""
+        return ', '.join(
+            f'{name};dur={duration * 1000:.1f};desc="{self.counts[name]}"'
+            for name, duration in self.durations.items()
+        )
+
+
+@contextmanager
+def collect():
+    """Collect timings of the current thread into the yielded Timings."""
+    _local.timings = Timings()
+    try:
+        with _local.timings.measure('app'):
+            yield _local.timings
+    finally:
+        del _local.timings
+
+
+@contextmanager
+def measure(name):
+    timings = getattr(_local, 'timings', None)
+    if timings is None:
+        yield
+        return
+    with timings.measure(name):
+        yield
+
+
+def sql(execute, sql, params, many, context):
+    """Execute wrapper counting queries to `db`."""
+    with measure('db'):
+        return execute(sql, params, many, context)
+
+
+def timed_processor(processor):
+    @wraps(processor)
+    def wrapper(request):
+        with measure('ctx'):
+            return processor(request)
+    return wrapper
+
+
+class TimedTemplate(Template):
+    def render(self, context=None, request=None):
+        started = time.perf_counter()
+        try:
+            with measure('tpl'):
+                return super().render(context, request)
+        finally:
+            metrics.observe(
+                'yatube_template_render_seconds',
+                (('template', self.origin.template_name),),
+                time.perf_counter() - started,
+            )
+
+
+class TimedDjangoTemplates(DjangoTemplates):
+    """Django templates counting rendering to `tpl` and processors to `ctx`.
+
+    Outside of collect() the overhead is one attribute lookup per
+    rendered template and context processor. Render time of every
+    template is also observed in the metrics.
+    """
+
+    def __init__(self, params):
+        super().__init__(params)
+        self.engine.template_context_processors = tuple(
+            timed_processor(processor)
+            for processor in self.engine.template_context_processors
+        )
+
+    def from_string(self, template_code):
+        return TimedTemplate(self.engine.from_string(template_code), self)
+
+    def get_template(self, template_name):
+        return TimedTemplate(super().get_template(template_name).template,
+                             self)
@@ -0,0 +1,32 @@
+from django.conf import settings
+
+
+def pk_chunks(queryset, chunk_size=None):
+    """Yield lists of primary keys of the queryset in ascending order.
+
+    Chunks are taken with a keyset condition on the primary key, so each
+    one is an index range scan regardless of how far the walk has got
+    and rows changed by the caller between chunks are not skipped.
+    """
+    chunk_size = chunk_size or settings.BULK_CHUNK_SIZE
+    pks = queryset.order_by('pk').values_list('pk', flat=True)
+    last_pk = None
+    while True:
+        chunk = pks if last_pk is None else pks.filter(pk__gt=last_pk)
+        chunk = list(chunk[:chunk_size])
+        if not chunk:
+            return
+        yield chunk
+        last_pk = chunk[-1]
+
+
+def keyset_rows(queryset, *fields, chunk_size=None):
+    """Yield (pk, *fields) tuples of the queryset in primary key order.
+
+    Rows are read by the chunks of pk_chunks, each as a range of the
+    primary key, so a walk over millions of rows keeps memory and query
+    cost flat.
+    """
+    rows = queryset.order_by('pk').values_list('pk', *fields)
+    for chunk in pk_chunks(queryset, chunk_size):
+        yield from rows.filter(pk__range=(chunk[0], chunk[-1]))
@@ -0,0 +1,13 @@
+from django.http import HttpResponse
+
+from core.metrics import CONTENT_TYPE, collect, exposition, metrics
+
+
+def metrics_view(request):
+    """Metrics of all workers for Prometheus.
+
+    The endpoint is public, scraping from outside should be closed on
+    the proxy.
+    """
+    metrics.flush()
+    return HttpResponse(exposition(collect()), content_type=CONTENT_TYPE)
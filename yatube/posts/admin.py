@@ -1,6 +1,80 @@
-from django.contrib import admin
+from datetime import timedelta
 
-from .models import Group, Post
+from django import forms
+from django.conf import settings
+from django.contrib import admin, messages
+from django.contrib.admin.helpers import ActionForm
+from django.contrib.auth.admin import UserAdmin
+from django.core.cache import cache
+from django.db.models import Count
+from django.utils import timezone
+
+from .bulk import bulk_delete, bulk_update, delete_group, delete_user
+from .models import ArchivedPost, Group, Post, User
+from .paginators import EstimatedCountPaginator
+
+GROUP_CHOICES_CACHE_KEY = 'admin:group_choices'
+
+
+def group_choices():
+    """Return cached choices for the group select of the change list."""
+    choices = cache.get(GROUP_CHOICES_CACHE_KEY)
+    if choices is None:
+        choices = [('', '---------')]
+        choices.extend(Group.objects.values_list('pk', 'title'))
+        cache.set(
+            GROUP_CHOICES_CACHE_KEY, choices, settings.ADMIN_CACHE_TIMEOUT)
+    return choices
+
+
+class PostActionForm(ActionForm):
+    """Action form with the arguments of the bulk actions."""
+    group = forms.ModelChoiceField(
+        queryset=Group.objects.all(),
+        required=False,
+        label='Группа',
+    )
+    days = forms.IntegerField(
+        required=False,
+        min_value=1,
+        label='Старше (дней)',
+    )
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.fields['group'].choices = group_choices()
+
+
+class DuplicateFilter(admin.SimpleListFilter):
+    """Posts whose normalized text is repeated at least N times.
+
+    Only posts of the last ADMIN_DUPLICATE_WINDOW_DAYS are grouped, so the
+    GROUP BY does not grow with the whole table. Posts without a hash yet
+    are not duplicates of each other.
+    """
+    title = 'Дубликаты'
+    parameter_name = 'duplicates'
+
+    def lookups(self, request, model_admin):
+        return (
+            ('2', 'повторы'),
+            ('10', '10 и более копий'),
+            ('100', '100 и более копий'),
+        )
+
+    def queryset(self, request, queryset):
+        if not (self.value() or '').isdigit():
+            return queryset
+        since = timezone.now() - timedelta(
+            days=settings.ADMIN_DUPLICATE_WINDOW_DAYS)
+        recent = Post.objects.filter(pub_date__gte=since).exclude(
+            content_hash='')
+        repeated = recent.order_by().values('content_hash').annotate(
+            copies=Count('pk')).filter(copies__gte=int(self.value()))
+        return queryset.filter(
+            pub_date__gte=since,
+            content_hash__in=repeated.values('content_hash'),
+        ).order_by('content_hash', '-pub_date')
 
 
 class PostAdmin(admin.ModelAdmin):
@@ -11,17 +85,138 @@ class PostAdmin(admin.ModelAdmin):
         'pub_date',
         'author',
         'group',
+        'content_hash',
     )
+    #  Join author and group instead of a query per row
+    list_select_related = ('author', 'group')
     #  Allow to change field group
     list_editable = ('group',)
     #  Search interface for posts
     search_fields = ('text',)
-    #  Date filter
-    list_filter = ('pub_date',)
+    #  Date filter, its fixed ranges run on the pub_date index
+    list_filter = ('pub_date', DuplicateFilter)
+    #  Estimate the size of the table instead of counting it twice
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
     #  Empty field
     empty_value_display = '-пусто-'
+    #  Set-based actions, with "select all" they get the filtered queryset
+    action_form = PostActionForm
+    actions = (
+        'reassign_group',
+        'detach_group',
+        'delete_by_author',
+        'delete_older_than',
+    )
+
+    def formfield_for_foreignkey(self, db_field, request, **kwargs):
+        formfield = super().formfield_for_foreignkey(
+            db_field, request, **kwargs)
+        if db_field.name == 'group':
+            #  Every row of the change list shares one list of choices
+            formfield.choices = group_choices()
+        return formfield
+
+    def action_argument(self, request, name):
+        """Return a cleaned argument of the action form or None."""
+        field = self.action_form.base_fields[name]
+        try:
+            return field.clean(request.POST.get(name))
+        except forms.ValidationError:
+            return None
+
+    def reassign_group(self, request, queryset):
+        group = self.action_argument(request, 'group')
+        if group is None:
+            self.message_user(
+                request, 'Выберите группу для переноса записей.',
+                messages.ERROR)
+            return
+        updated = bulk_update(queryset, group=group)
+        self.message_user(
+            request, f'Перенесено в группу «{group}» записей: {updated}')
+    reassign_group.short_description = 'Перенести в группу'
+
+    def detach_group(self, request, queryset):
+        updated = bulk_update(queryset, group=None)
+        self.message_user(request, f'Отвязано от групп записей: {updated}')
+    detach_group.short_description = 'Отвязать от группы'
+
+    def delete_by_author(self, request, queryset):
+        #  Authors are fixed up front, the selection shrinks while deleting
+        authors = set(
+            queryset.order_by().values_list('author_id', flat=True).distinct())
+        deleted = bulk_delete(Post.objects.filter(author_id__in=authors))
+        self.message_user(
+            request, f'Удалено записей выбранных авторов: {deleted}')
+    delete_by_author.short_description = 'Удалить все записи авторов'
+
+    def delete_older_than(self, request, queryset):
+        days = self.action_argument(request, 'days')
+        if days is None:
+            self.message_user(
+                request, 'Укажите возраст записей в днях.', messages.ERROR)
+            return
+        cutoff = timezone.now() - timedelta(days=days)
+        deleted = bulk_delete(queryset.filter(pub_date__lt=cutoff))
+        self.message_user(
+            request, f'Удалено записей старше {days} дн.: {deleted}')
+    delete_older_than.short_description = 'Удалить записи старше N дней'
+
+
+class ChunkedDeleteMixin:
+    """Delete objects owning many posts through posts.bulk.
+
+    The stock deletion collects every related post to list it on the
+    confirmation page and deletes them one signal at a time. Here the
+    confirmation shows counts and the posts go in chunks.
+    """
+    #  Permission needed for what happens to the posts
+    posts_permission = 'posts.delete_post'
+    posts_field = None
+    posts_message = 'Удалено записей: {}'
+    #  Function of posts.bulk deleting an object, returns affected posts
+    delete_function = None
+
+    def get_deleted_objects(self, objs, request):
+        objs = list(objs)
+        pks = [obj.pk for obj in objs]
+        lookup = {f'{self.posts_field}_id__in': pks}
+        posts = (Post.objects.filter(**lookup).count()
+                 + ArchivedPost.objects.filter(**lookup).count())
+        perms_needed = set()
+        if posts and not request.user.has_perm(self.posts_permission):
+            perms_needed.add(Post._meta.verbose_name)
+        model_count = {
+            self.model._meta.verbose_name_plural: len(objs),
+            Post._meta.verbose_name_plural: posts,
+        }
+        return [str(obj) for obj in objs], model_count, perms_needed, []
+
+    def delete_model(self, request, obj):
+        posts = self.delete_function(obj)
+        self.message_user(request, self.posts_message.format(posts))
+
+    def delete_queryset(self, request, queryset):
+        posts = sum(self.delete_function(obj) for obj in queryset)
+        self.message_user(request, self.posts_message.format(posts))
+
+
+class GroupAdmin(ChunkedDeleteMixin, admin.ModelAdmin):
+    #  Posts of a deleted group stay, detached from it
+    posts_permission = 'posts.change_post'
+    posts_field = 'group'
+    posts_message = 'Отвязано от групп записей: {}'
+    delete_function = staticmethod(delete_group)
+
+
+class ChunkedDeleteUserAdmin(ChunkedDeleteMixin, UserAdmin):
+    posts_field = 'author'
+    delete_function = staticmethod(delete_user)
 
 
 #  Configuration to register Post model as class PostAdmin
 admin.site.register(Post, PostAdmin)
-admin.site.register(Group)
+admin.site.register(Group, GroupAdmin)
+admin.site.unregister(User)
+admin.site.register(User, ChunkedDeleteUserAdmin)
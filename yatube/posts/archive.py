@@ -0,0 +1,93 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.http import Http404
+from django.utils import timezone
+from django.utils.functional import cached_property
+
+from .models import ArchivedPost, Post, TimelineEntry
+
+
+def cutoff():
+    """Posts published before this moment belong to the archive."""
+    return timezone.now() - timedelta(days=settings.POSTS_ARCHIVE_AFTER_DAYS)
+
+
+def archivable():
+    """Old posts without revisions, revisions refer to posts_post."""
+    return Post.objects.filter(
+        pub_date__lt=cutoff(), revisions__isnull=True)
+
+
+def archive(pks):
+    """Move the posts to the archive, return how many were moved.
+
+    The archive is written first and committed before the hot table
+    when it is another database, so a failure in between leaves a post
+    in both tables and a rerun completes the move.
+    """
+    fields = [field.attname for field in ArchivedPost._meta.concrete_fields]
+    with transaction.atomic(), transaction.atomic(
+            using=settings.POSTS_ARCHIVE_DATABASE):
+        posts = list(archivable().filter(pk__in=pks))
+        ArchivedPost.objects.bulk_create(
+            (ArchivedPost(**{field: getattr(post, field)
+                             for field in fields})
+             for post in posts),
+            ignore_conflicts=True,
+        )
+        pks = [post.pk for post in posts]
+        # Timelines hold recent posts only, entries of old ones just go
+        entries = TimelineEntry.objects.filter(post_id__in=pks)
+        entries._raw_delete(entries.db)
+        moved = Post.objects.filter(pk__in=pks)
+        moved._raw_delete(moved.db)
+    return len(posts)
+
+
+def get_post_or_404(pk):
+    """Return the post from the hot table or, failing that, the archive."""
+    post = Post.objects.select_related('author', 'group').filter(
+        pk=pk).first()
+    if post is None:
+        post = ArchivedPost.objects.filter(pk=pk).first()
+    if post is None:
+        raise Http404('No post matches the given query.')
+    return post
+
+
+class AuthorPosts:
+    """Posts of the author newest first: hot ones, then archived ones.
+
+    Archived posts are older than hot ones, except hot posts kept for
+    their revisions, so the two tables are read one after the other
+    instead of being merged. Quacks enough like a queryset for paginators.
+    """
+
+    def __init__(self, author):
+        self.hot = author.posts.select_related('group', 'author')
+        # No joins, the archive may be in another database
+        self.archived = ArchivedPost.objects.filter(
+            author_id=author.pk).prefetch_related('group', 'author')
+
+    @cached_property
+    def hot_count(self):
+        return self.hot.count()
+
+    @cached_property
+    def total(self):
+        return self.hot_count + self.archived.count()
+
+    def count(self):
+        return self.total
+
+    def __getitem__(self, index):
+        start, stop = index.start or 0, index.stop
+        posts = []
+        if start < self.hot_count:
+            posts += self.hot[start:min(stop, self.hot_count)]
+        if stop > self.hot_count:
+            posts += self.archived[
+                max(start - self.hot_count, 0):stop - self.hot_count]
+        return posts
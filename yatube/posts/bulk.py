@@ -0,0 +1,113 @@
+"""Set-based changes of many posts in short chunked transactions.
+
+Rows are neither loaded nor sent through signals, so side tables kept
+by posts.signals are maintained here instead: revisions and timeline
+entries are deleted with their posts, group and follower stats are
+rebuilt for the touched groups and authors.
+"""
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Q
+
+from core.utils import pk_chunks
+
+from . import stats, timeline
+from .models import ArchivedPost, Follow, Post, PostRevision, TimelineEntry
+
+
+def touched_groups(chunk, model=Post):
+    """Return groups of the posts with the given primary keys."""
+    return set(model.objects.filter(pk__in=chunk).order_by()
+               .values_list('group_id', flat=True).distinct())
+
+
+def raw_delete(queryset):
+    """DELETE the rows without loading them, return the number of rows."""
+    return queryset._raw_delete(queryset.db)
+
+
+def report(progress, message):
+    if progress is not None:
+        progress(message)
+
+
+def bulk_update(queryset, progress=None, **values):
+    """Update the queryset chunk by chunk, return the number of rows."""
+    updated = 0
+    groups = set()
+    for chunk in pk_chunks(queryset):
+        with transaction.atomic():
+            groups |= touched_groups(chunk)
+            updated += Post.objects.filter(pk__in=chunk).update(**values)
+            groups |= touched_groups(chunk)
+        report(progress, f'Updated {updated} posts...')
+    stats.rebuild(groups)
+    return updated
+
+
+def bulk_delete(queryset, progress=None):
+    """Delete the queryset chunk by chunk, return the number of rows."""
+    deleted = 0
+    groups = set()
+    for chunk in pk_chunks(queryset):
+        with transaction.atomic():
+            groups |= touched_groups(chunk)
+            raw_delete(PostRevision.objects.filter(post_id__in=chunk))
+            raw_delete(TimelineEntry.objects.filter(post_id__in=chunk))
+            deleted += raw_delete(Post.objects.filter(pk__in=chunk))
+        report(progress, f'Deleted {deleted} posts...')
+    stats.rebuild(groups)
+    return deleted
+
+
+def archived_chunks(queryset):
+    """Yield chunks of archived posts within a transaction of the archive."""
+    for chunk in pk_chunks(queryset):
+        with transaction.atomic(using=settings.POSTS_ARCHIVE_DATABASE):
+            yield chunk
+
+
+def delete_user(user, progress=None):
+    """Delete the user after its posts and follows, return posts count.
+
+    What is left to the collector of user.delete() is a handful of
+    rows, and the usual signals drop the cached user.
+    """
+    deleted = bulk_delete(Post.objects.filter(author=user), progress)
+    archived = ArchivedPost.objects.filter(author_id=user.pk)
+    groups = set()
+    for chunk in archived_chunks(archived):
+        groups |= touched_groups(chunk, ArchivedPost)
+        deleted += raw_delete(ArchivedPost.objects.filter(pk__in=chunk))
+        report(progress, f'Deleted {deleted} posts...')
+    stats.rebuild(groups)
+    authors = set()
+    follows = Follow.objects.filter(Q(user=user) | Q(author=user))
+    for chunk in pk_chunks(follows):
+        with transaction.atomic():
+            authors |= set(Follow.objects.filter(pk__in=chunk).values_list(
+                'author_id', flat=True))
+            raw_delete(Follow.objects.filter(pk__in=chunk))
+    for chunk in pk_chunks(TimelineEntry.objects.filter(user=user)):
+        with transaction.atomic():
+            raw_delete(TimelineEntry.objects.filter(pk__in=chunk))
+    authors -= {user.pk}
+    followers = timeline.followers_counts(authors)
+    stats.rebuild_followers(authors)
+    for author_id in authors:
+        timeline.catch_up(author_id, followers.get(author_id, 0))
+    user.delete()
+    return deleted
+
+
+def delete_group(group, progress=None):
+    """Delete the group after detaching its posts, return their number."""
+    detached = bulk_update(Post.objects.filter(group=group), progress,
+                           group=None)
+    archived = ArchivedPost.objects.filter(group_id=group.pk)
+    for chunk in archived_chunks(archived):
+        detached += ArchivedPost.objects.filter(pk__in=chunk).update(
+            group=None)
+        report(progress, f'Updated {detached} posts...')
+    group.delete()
+    return detached
@@ -0,0 +1,79 @@
+import logging
+import threading
+import time
+from collections import Counter
+
+from django.conf import settings
+from django.db import DatabaseError
+from django.db.models import Case, F, IntegerField, Value, When
+
+from .models import Post
+
+logger = logging.getLogger(__name__)
+
+
+class ViewCounter:
+    """Per-process buffer of post views flushed in batched UPDATEs.
+
+    Hits only increment a counter in memory. The buffer is written with
+    one UPDATE ... CASE statement when it holds VIEW_COUNTER_FLUSH_SIZE
+    hits or is older than VIEW_COUNTER_FLUSH_INTERVAL seconds, and when
+    the serving process exits, see yatube.wsgi. Counts of a failed flush
+    are put back into the buffer, so only a hard crash of the process
+    loses views, at most one buffer worth of them.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.buffer = Counter()
+        self.hits = 0
+        self.flushed_at = time.monotonic()
+
+    def hit(self, post_id):
+        with self.lock:
+            self.buffer[post_id] += 1
+            self.hits += 1
+            due = (
+                self.hits >= settings.VIEW_COUNTER_FLUSH_SIZE
+                or time.monotonic() - self.flushed_at
+                >= settings.VIEW_COUNTER_FLUSH_INTERVAL
+            )
+        if due:
+            try:
+                self.flush()
+            except DatabaseError:
+                # A busy database must not fail the page, the buffer is
+                # kept for the next flush
+                logger.warning('Post views were not flushed', exc_info=True)
+
+    def flush(self):
+        """Write buffered views to the database."""
+        with self.lock:
+            buffer, self.buffer = self.buffer, Counter()
+            self.hits = 0
+            self.flushed_at = time.monotonic()
+        if not buffer:
+            return
+        increment = Case(
+            *(When(pk=pk, then=Value(count))
+              for pk, count in buffer.items()),
+            default=Value(0),
+            output_field=IntegerField(),
+        )
+        try:
+            Post.objects.filter(pk__in=buffer).update(
+                views=F('views') + increment)
+        except Exception:
+            with self.lock:
+                self.buffer.update(buffer)
+                self.hits += sum(buffer.values())
+            raise
+
+    def flush_on_exit(self):
+        try:
+            self.flush()
+        except Exception:
+            logger.exception('Post views were lost on exit')
+
+
+view_counter = ViewCounter()
@@ -7,14 +7,16 @@ class PostForm(forms.ModelForm):
     class Meta:
         model = Post
 
-        fields = ('group', 'text',)
+        fields = ('group', 'text', 'image')
 
         labels = {
             'group': 'Группа',
             'text': 'Текст',
+            'image': 'Картинка',
         }
 
         help_texts = {
             'group': 'Выберите группу для новой записи',
             'text': 'Добавьте текст для новой записи',
+            'image': 'Загрузите картинку к записи',
         }
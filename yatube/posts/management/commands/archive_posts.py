@@ -0,0 +1,22 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from core.utils import pk_chunks
+from posts import archive
+
+
+class Command(BaseCommand):
+    help = ('Move posts older than POSTS_ARCHIVE_AFTER_DAYS to the archive '
+            'in chunks.')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size', type=int, default=settings.BULK_CHUNK_SIZE,
+            help='Number of posts moved per transaction.')
+
+    def handle(self, *args, **options):
+        moved = 0
+        for chunk in pk_chunks(archive.archivable(), options['batch_size']):
+            moved += archive.archive(chunk)
+            self.stdout.write(f'Archived {moved} posts...')
+        self.stdout.write(self.style.SUCCESS(f'Posts archived: {moved}'))
@@ -0,0 +1,22 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from core.utils import pk_chunks
+from posts.models import Post, content_hash
+
+
+class Command(BaseCommand):
+    help = 'Fill content_hash of posts saved before it existed.'
+
+    def handle(self, *args, **options):
+        missing = Post.objects.filter(content_hash='')
+        filled = 0
+        for chunk in pk_chunks(missing):
+            posts = list(Post.objects.filter(pk__in=chunk).only('pk', 'text'))
+            for post in posts:
+                post.content_hash = content_hash(post.text)
+            with transaction.atomic():
+                Post.objects.bulk_update(posts, ['content_hash'])
+            filled += len(posts)
+            self.stdout.write(f'Hashed {filled} posts...')
+        self.stdout.write(self.style.SUCCESS(f'Posts hashed: {filled}'))
@@ -0,0 +1,37 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from posts.bulk import delete_group, delete_user
+from posts.models import Group, User
+
+
+class Command(BaseCommand):
+    help = ('Delete users with their posts and groups, detaching their '
+            'posts, in chunked transactions.')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--user', action='append', default=[], dest='users',
+            metavar='USERNAME', help='User to delete, may be repeated.')
+        parser.add_argument(
+            '--group', action='append', default=[], dest='groups',
+            metavar='SLUG', help='Group to delete, may be repeated.')
+
+    def handle(self, *args, **options):
+        users = list(User.objects.filter(username__in=options['users']))
+        groups = list(Group.objects.filter(slug__in=options['groups']))
+        missing = (
+            set(options['users']) - {user.username for user in users}
+            | set(options['groups']) - {group.slug for group in groups}
+        )
+        if missing:
+            raise CommandError(f'Not found: {", ".join(sorted(missing))}')
+        for user in users:
+            self.stdout.write(f'Deleting user {user}...')
+            deleted = delete_user(user, progress=self.stdout.write)
+            self.stdout.write(self.style.SUCCESS(
+                f'User {user} deleted with {deleted} posts'))
+        for group in groups:
+            self.stdout.write(f'Deleting group {group}...')
+            detached = delete_group(group, progress=self.stdout.write)
+            self.stdout.write(self.style.SUCCESS(
+                f'Group {group} deleted, posts detached: {detached}'))
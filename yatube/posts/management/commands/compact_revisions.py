@@ -0,0 +1,27 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from core.utils import pk_chunks
+from posts import revisions
+from posts.models import Post
+
+
+class Command(BaseCommand):
+    help = 'Re-encode post revisions and drop old ones.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--keep', type=int,
+            help='Number of latest revisions to keep for each post.')
+
+    def handle(self, *args, **options):
+        edited = Post.objects.filter(revisions__isnull=False).distinct()
+        posts = kept = 0
+        for chunk in pk_chunks(edited):
+            for post in Post.objects.filter(pk__in=chunk):
+                with transaction.atomic():
+                    kept += revisions.compact(post, options['keep'])
+                posts += 1
+            self.stdout.write(f'Compacted {posts} posts...')
+        self.stdout.write(self.style.SUCCESS(
+            f'Posts compacted: {posts}, revisions kept: {kept}'))
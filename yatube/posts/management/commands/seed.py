@@ -0,0 +1,180 @@
+import multiprocessing
+import os
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
+from datetime import date, datetime, timezone
+
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+
+from posts import stats
+from posts.models import Group, Post, User, content_hash
+from posts.seeding import faker, generate_posts
+
+SQLITE_LOAD_PRAGMAS = {
+    'synchronous': 'OFF',
+    'journal_mode': 'MEMORY',
+    'temp_store': 'MEMORY',
+    'cache_size': '-262144',
+}
+
+
+class Command(BaseCommand):
+    help = ('Generate users, groups and posts for load testing. The same '
+            'seed and scale always give the same data.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--posts', type=int, default=10_000_000)
+        parser.add_argument('--users', type=int, default=100_000)
+        parser.add_argument('--groups', type=int, default=1_000)
+        parser.add_argument(
+            '--days', type=int, default=3650,
+            help='Posts are published during the days before --until.')
+        parser.add_argument(
+            '--until', type=date.fromisoformat, default=date.today(),
+            help='Date after the last post, YYYY-MM-DD. Runs of another '
+                 'day give the same data only with the same date.')
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument(
+            '--workers', type=int, default=os.cpu_count(),
+            help='Processes generating posts, 0 generates in this one.')
+        parser.add_argument(
+            '--chunk-size', type=int, default=10_000,
+            help='Posts generated by a task and inserted per transaction.')
+        parser.add_argument(
+            '--password', default='yatube-seed',
+            help='Password of all generated users.')
+
+    def handle(self, *args, **options):
+        self.options = options
+        self.prefix = f'seed{options["seed"]}-'
+        if (User.objects.filter(username__startswith=self.prefix).exists()
+                or Group.objects.filter(slug__startswith=self.prefix)
+                .exists()):
+            raise CommandError(
+                f'Data of seed {options["seed"]} is already loaded.')
+        started = time.monotonic()
+        author_ids = self.create_users()
+        group_ids = self.create_groups()
+        with self.load_mode():
+            self.create_posts(author_ids, group_ids)
+        stats.rebuild(group_ids)
+        self.stdout.write(self.style.SUCCESS(
+            f'Seeded {len(author_ids)} users, {len(group_ids)} groups and '
+            f'{options["posts"]} posts in {time.monotonic() - started:.0f}s'))
+
+    def create_users(self):
+        fake = faker(self.options['seed'], 'users')
+        password = make_password(self.options['password'])
+        User.objects.bulk_create(
+            (User(
+                username=f'{self.prefix}{number}-{fake.user_name()}'[:150],
+                first_name=fake.first_name(),
+                last_name=fake.last_name(),
+                email=fake.email(),
+                password=password,
+            ) for number in range(self.options['users']))
+        )
+        return list(User.objects.filter(username__startswith=self.prefix)
+                    .order_by('pk').values_list('pk', flat=True))
+
+    def create_groups(self):
+        fake = faker(self.options['seed'], 'groups')
+        Group.objects.bulk_create(
+            (Group(
+                title=fake.sentence(nb_words=3).rstrip('.'),
+                slug=f'{self.prefix}{number}',
+                description=fake.paragraph(),
+            ) for number in range(self.options['groups']))
+        )
+        return list(Group.objects.filter(slug__startswith=self.prefix)
+                    .order_by('pk').values_list('pk', flat=True))
+
+    @contextmanager
+    def load_mode(self):
+        """Load posts without their Meta indexes and, on SQLite, fsync.
+
+        Indexes are built once after the load instead of being updated
+        by every insert. Everything is restored even if the load fails.
+        """
+        pragmas = {}
+        if connection.vendor == 'sqlite':
+            with connection.cursor() as cursor:
+                for pragma, value in SQLITE_LOAD_PRAGMAS.items():
+                    cursor.execute(f'PRAGMA {pragma}')
+                    pragmas[pragma] = cursor.fetchone()[0]
+                    cursor.execute(f'PRAGMA {pragma} = {value}')
+        with connection.schema_editor() as editor:
+            for index in Post._meta.indexes:
+                editor.remove_index(Post, index)
+        try:
+            yield
+        finally:
+            self.stdout.write('Building indexes...')
+            with connection.schema_editor() as editor:
+                for index in Post._meta.indexes:
+                    editor.add_index(Post, index)
+            with connection.cursor() as cursor:
+                for pragma, value in pragmas.items():
+                    cursor.execute(f'PRAGMA {pragma} = {value}')
+
+    def tasks(self, author_ids, group_ids):
+        options = self.options
+        end = datetime.combine(
+            options['until'], datetime.min.time(), timezone.utc).timestamp()
+        start = end - options['days'] * 24 * 60 * 60
+        chunks = -(-options['posts'] // options['chunk_size'])
+        for chunk in range(chunks):
+            size = min(options['chunk_size'],
+                       options['posts'] - chunk * options['chunk_size'])
+            yield (options['seed'], chunk, chunks, size, len(author_ids),
+                   len(group_ids), start, end)
+
+    def generated(self, tasks):
+        """Yield generated chunks in order, keeping few of them in memory."""
+        workers = self.options['workers']
+        if not workers:
+            yield from map(generate_posts, tasks)
+            return
+        # Generation does not need Django, spawned workers import only it
+        with ProcessPoolExecutor(
+                workers,
+                mp_context=multiprocessing.get_context('spawn')) as executor:
+            pending = deque()
+            for task in tasks:
+                pending.append(executor.submit(generate_posts, task))
+                if len(pending) > workers * 2:
+                    yield pending.popleft().result()
+            while pending:
+                yield pending.popleft().result()
+
+    def create_posts(self, author_ids, group_ids):
+        # Generated dates would be replaced by the current time otherwise
+        pub_date = Post._meta.get_field('pub_date')
+        pub_date.auto_now_add = False
+        try:
+            self.insert_posts(author_ids, group_ids)
+        finally:
+            pub_date.auto_now_add = True
+
+    def insert_posts(self, author_ids, group_ids):
+        created = 0
+        for chunk in self.generated(self.tasks(author_ids, group_ids)):
+            posts = [
+                Post(
+                    text=text,
+                    pub_date=datetime.fromtimestamp(timestamp, timezone.utc),
+                    author_id=author_ids[author],
+                    group_id=None if group is None else group_ids[group],
+                    # bulk_create does not call Post.save
+                    content_hash=content_hash(text),
+                )
+                for text, timestamp, author, group in chunk
+            ]
+            with transaction.atomic():
+                Post.objects.bulk_create(posts)
+            created += len(posts)
+            self.stdout.write(f'Created {created} posts...')
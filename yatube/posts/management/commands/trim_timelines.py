@@ -0,0 +1,25 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db.models import Count
+
+from core.utils import pk_chunks
+from posts import timeline
+from posts.models import TimelineEntry, User
+
+
+class Command(BaseCommand):
+    help = ('Trim follow timelines to TIMELINE_SIZE entries, those of users '
+            'who do not read their feed too.')
+
+    def handle(self, *args, **options):
+        overfull = TimelineEntry.objects.order_by().values('user').annotate(
+            entries=Count('pk')).filter(
+            entries__gt=settings.TIMELINE_SIZE).values('user')
+        users = 0
+        for chunk in pk_chunks(User.objects.filter(pk__in=overfull)):
+            for user_id in chunk:
+                timeline.trim(user_id)
+            users += len(chunk)
+            self.stdout.write(f'Trimmed timelines of {users} users...')
+        self.stdout.write(self.style.SUCCESS(
+            f'Timelines trimmed: {users}'))
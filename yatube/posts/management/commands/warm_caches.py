@@ -0,0 +1,90 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import connections
+from django.db.models import Count
+from django.test import Client
+from django.urls import reverse
+
+from posts.models import GroupStats, User
+
+
+class Command(BaseCommand):
+    help = 'Render the busiest feeds to fill page and fragment caches.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--pages', type=int, default=5,
+            help='Number of pages of every feed to render.')
+        parser.add_argument(
+            '--groups', type=int, default=100,
+            help='Number of most active groups to warm.')
+        parser.add_argument(
+            '--authors', type=int, default=100,
+            help='Number of authors with most posts to warm.')
+        parser.add_argument(
+            '--connections', type=int, default=4,
+            help='Number of threads, each holds one DB connection.')
+        parser.add_argument(
+            '--host', default=settings.ALLOWED_HOSTS[0],
+            help='Host of the site, it is a part of page cache keys.')
+        parser.add_argument(
+            '--secure', action='store_true',
+            help='Render pages as requested over https.')
+
+    def handle(self, *args, **options):
+        self.options = options
+        feeds = [(reverse('posts:index'), reverse('posts:index_fragment'))]
+        groups = GroupStats.objects.filter(posts_count__gt=0).select_related(
+            'group').order_by('-last_post_at')[:options['groups']]
+        for stats in groups:
+            slug = stats.group.slug
+            feeds.append((
+                reverse('posts:group_list', args=[slug]),
+                reverse('posts:group_list_fragment', args=[slug]),
+            ))
+        authors = User.objects.annotate(posts_total=Count('posts')).filter(
+            posts_total__gt=0).order_by('-posts_total')[:options['authors']]
+        for username in authors.values_list('username', flat=True):
+            feeds.append((
+                reverse('posts:profile', args=[username]),
+                reverse('posts:profile_fragment', args=[username]),
+            ))
+        started = time.perf_counter()
+        with ThreadPoolExecutor(options['connections']) as executor:
+            results = list(executor.map(self.warm_feed, feeds))
+        elapsed = time.perf_counter() - started
+        for url, requests, size, seconds in results:
+            self.stdout.write(
+                f'{url}: {requests} requests, {size} bytes, {seconds:.2f} s')
+        self.stdout.write(self.style.SUCCESS(
+            f'Warmed {len(results)} feeds, '
+            f'{sum(result[1] for result in results)} requests, '
+            f'{sum(result[2] for result in results)} bytes '
+            f'in {elapsed:.2f} s'))
+
+    def warm_feed(self, urls):
+        """Render pages and fragments of one feed in this thread."""
+        page_url, fragment_url = urls
+        client = Client(HTTP_HOST=self.options['host'])
+        secure = self.options['secure']
+        started = time.perf_counter()
+        requests = size = 0
+        cursor = None
+        try:
+            for page in range(1, self.options['pages'] + 1):
+                response = client.get(page_url, {'page': page}, secure=secure)
+                size += len(response.content)
+                params = {'cursor': cursor} if cursor else {}
+                response = client.get(fragment_url, params, secure=secure)
+                size += len(response.content)
+                requests += 2
+                cursor = response.json()['next_cursor']
+                if cursor is None:
+                    break
+        finally:
+            # The thread is reused, its connection is not kept open
+            connections.close_all()
+        return page_url, requests, size, time.perf_counter() - started
@@ -0,0 +1,43 @@
+# Generated by Django 2.2.28 on 2026-10-19 11:58
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def fill_group_stats(apps, schema_editor):
+    Group = apps.get_model('posts', 'Group')
+    GroupStats = apps.get_model('posts', 'GroupStats')
+    groups = Group.objects.annotate(
+        total=models.Count('posts'), last=models.Max('posts__pub_date'))
+    GroupStats.objects.bulk_create(
+        GroupStats(group_id=group.pk, posts_count=group.total,
+                   last_post_at=group.last)
+        for group in groups.iterator()
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0004_auto_20261019_1157'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='GroupStats',
+            fields=[
+                ('group', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='stats', serialize=False, to='posts.Group')),
+                ('posts_count', models.PositiveIntegerField(default=0, verbose_name='Количество постов')),
+                ('last_post_at', models.DateTimeField(null=True, verbose_name='Последний пост')),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='groupstats',
+            index=models.Index(fields=['-last_post_at'], name='posts_group_last_po_6ea643_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='groupstats',
+            index=models.Index(fields=['-posts_count'], name='posts_group_posts_c_355b83_idx'),
+        ),
+        migrations.RunPython(fill_group_stats, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,22 @@
+# Generated by Django 2.2.28 on 2026-10-19 12:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0005_groupstats'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='post',
+            name='views',
+            field=models.PositiveIntegerField(default=0, verbose_name='Просмотры'),
+        ),
+        migrations.AddIndex(
+            model_name='post',
+            index=models.Index(fields=['-views', '-pub_date'], name='posts_post_views_77388e_idx'),
+        ),
+    ]
@@ -0,0 +1,22 @@
+# Generated by Django 2.2.28 on 2026-10-19 12:03
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0008_post_image'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='post',
+            name='content_hash',
+            field=models.CharField(blank=True, editable=False, max_length=32),
+        ),
+        migrations.AddIndex(
+            model_name='post',
+            index=models.Index(fields=['content_hash', 'author', 'pub_date'], name='posts_post_content_4cf162_idx'),
+        ),
+    ]
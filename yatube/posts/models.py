@@ -1,3 +1,5 @@
+import hashlib
+
 from django.contrib.auth import get_user_model
 from django.db import models
 
@@ -6,13 +8,19 @@ from posts.validators import validate_not_empty
 User = get_user_model()
 
 
+def content_hash(text):
+    """Hash of the text with case and whitespace normalized."""
+    normalized = ' '.join(text.lower().split())
+    return hashlib.blake2b(normalized.encode(), digest_size=16).hexdigest()
+
+
 class Post(models.Model):
     """ Class for creating posts."""
     text = models.TextField(
         'Текст поста',
         help_text='Введите текст поста',
         validators=[validate_not_empty])
-    pub_date = models.DateTimeField(auto_now_add=True)
+    pub_date = models.DateTimeField(auto_now_add=True, db_index=True)
     author = models.ForeignKey(
         User,
         on_delete=models.CASCADE,
@@ -27,12 +35,71 @@ class Post(models.Model):
         verbose_name='Группа',
         help_text='Группа, к которой будет относиться пост',
     )
+    image = models.ImageField(
+        'Картинка',
+        upload_to='posts/',
+        blank=True,
+    )
+    # Filled on save, see content_hash()
+    content_hash = models.CharField(max_length=32, blank=True, editable=False)
+    # Written in batches by posts.counters.view_counter
+    views = models.PositiveIntegerField('Просмотры', default=0)
 
     def __str__(self):
         return self.text
 
+    def save(self, *args, **kwargs):
+        self.content_hash = content_hash(self.text)
+        super().save(*args, **kwargs)
+
     class Meta:
         ordering = ['-pub_date']
+        # Feeds of a group and of an author are read newest first
+        indexes = [
+            models.Index(fields=['group', '-pub_date']),
+            models.Index(fields=['author', '-pub_date']),
+            models.Index(fields=['-views', '-pub_date']),
+            # Duplicates of an author and mass duplicates by text
+            models.Index(fields=['content_hash', 'author', 'pub_date']),
+        ]
+
+
+class ArchivedPost(models.Model):
+    """Post older than POSTS_ARCHIVE_AFTER_DAYS moved out of posts_post.
+
+    Same shape and primary key as Post, kept in POSTS_ARCHIVE_DATABASE by
+    posts.routers.ArchiveRouter. That may be another database, so the
+    relations have no constraints and archived posts are never joined
+    with users and groups, see posts.archive.
+    """
+    text = models.TextField('Текст поста')
+    pub_date = models.DateTimeField()
+    author = models.ForeignKey(
+        User,
+        on_delete=models.DO_NOTHING,
+        db_constraint=False,
+        related_name='archived_posts',
+    )
+    group = models.ForeignKey(
+        'Group',
+        null=True,
+        on_delete=models.DO_NOTHING,
+        db_constraint=False,
+        related_name='archived_posts',
+        verbose_name='Группа',
+    )
+    image = models.ImageField('Картинка', upload_to='posts/', blank=True)
+    content_hash = models.CharField(max_length=32, blank=True)
+    views = models.PositiveIntegerField('Просмотры', default=0)
+
+    def __str__(self):
+        return self.text
+
+    class Meta:
+        ordering = ['-pub_date']
+        indexes = [
+            models.Index(fields=['author', '-pub_date']),
+        ]
 
 
 class Group(models.Model):
@@ -43,3 +110,123 @@ class Group(models.Model):
 
     def __str__(self):
         return self.title
+
+
+class GroupStats(models.Model):
+    """Rollup of posts of a group kept up to date by posts.signals."""
+    group = models.OneToOneField(
+        Group,
+        primary_key=True,
+        on_delete=models.CASCADE,
+        related_name='stats',
+    )
+    posts_count = models.PositiveIntegerField('Количество постов', default=0)
+    last_post_at = models.DateTimeField('Последний пост', null=True)
+
+    def __str__(self):
+        return f'{self.group}: {self.posts_count}'
+
+    class Meta:
+        # Directory of groups is sorted by activity or by size
+        indexes = [
+            models.Index(fields=['-last_post_at']),
+            models.Index(fields=['-posts_count']),
+        ]
+
+
+class PostRevision(models.Model):
+    """Version of a post text saved on edit.
+
+    Text is kept zlib-compressed, either in full (a snapshot) or as a
+    delta against the previous revision, see posts.revisions.
+    """
+    post = models.ForeignKey(
+        Post,
+        on_delete=models.CASCADE,
+        related_name='revisions',
+    )
+    number = models.PositiveIntegerField('Номер версии')
+    is_snapshot = models.BooleanField(default=False)
+    data = models.BinaryField()
+    created = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f'{self.post_id} v{self.number}'
+
+    class Meta:
+        ordering = ['post', 'number']
+        unique_together = ['post', 'number']
+
+
+class Follow(models.Model):
+    """Subscription of a user to the posts of an author."""
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='follower',
+    )
+    author = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='following',
+    )
+
+    def __str__(self):
+        return f'{self.user} -> {self.author}'
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'author'], name='unique_follow'),
+            models.CheckConstraint(
+                check=~models.Q(user=models.F('author')),
+                name='no_self_follow'),
+        ]
+
+
+class AuthorStats(models.Model):
+    """Rollup of followers of an author kept up to date by posts.signals."""
+    author = models.OneToOneField(
+        User,
+        primary_key=True,
+        on_delete=models.CASCADE,
+        related_name='author_stats',
+    )
+    followers_count = models.PositiveIntegerField(
+        'Количество подписчиков', default=0)
+
+    def __str__(self):
+        return f'{self.author}: {self.followers_count}'
+
+
+class TimelineEntry(models.Model):
+    """Post of a followed author written to the timeline of a follower.
+
+    pub_date and author are copies of the post's ones, so a page of the
+    timeline is read from the index without joins, see posts.timeline.
+    """
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='timeline',
+    )
+    post = models.ForeignKey(
+        Post,
+        on_delete=models.CASCADE,
+        related_name='+',
+    )
+    author = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='+',
+    )
+    pub_date = models.DateTimeField()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'post'], name='unique_timeline_post'),
+        ]
+        indexes = [
+            models.Index(fields=['user', '-pub_date', '-post']),
+        ]
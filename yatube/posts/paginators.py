@@ -0,0 +1,179 @@
+import base64
+import heapq
+from datetime import datetime
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.paginator import Page, Paginator
+from django.db.models import Max, Min, Q
+from django.utils.functional import cached_property
+
+
+class EstimatedCountPaginator(Paginator):
+    """Paginator that estimates the size of an unfiltered table.
+
+    COUNT(*) over the whole table is a full scan, so for querysets
+    without filters the number of rows is taken from the primary key
+    range, which is two index lookups. Small tables and filtered
+    querysets are still counted exactly.
+
+    The range also counts deleted rows, so a page that comes back short
+    clamps the count to the rows actually there, and an empty page past
+    the real end falls back to an exact count.
+    """
+
+    def cache_key(self):
+        return f'estimated_count:{self.object_list.model._meta.label_lower}'
+
+    @cached_property
+    def count(self):
+        queryset = self.object_list
+        if queryset.query.where:
+            return super().count
+        model = queryset.model
+        cache_key = self.cache_key()
+        estimate = cache.get(cache_key)
+        if estimate is None:
+            bounds = model._default_manager.aggregate(
+                low=Min('pk'), high=Max('pk'))
+            if bounds['high'] is None:
+                estimate = 0
+            else:
+                estimate = bounds['high'] - bounds['low'] + 1
+            cache.set(cache_key, estimate, settings.ADMIN_CACHE_TIMEOUT)
+        if estimate < settings.ADMIN_ESTIMATED_COUNT_THRESHOLD:
+            return super().count
+        return estimate
+
+    def clamp(self, count):
+        """Replace the estimate with the real number of rows."""
+        self.count = count
+        self.__dict__.pop('num_pages', None)
+        if not self.object_list.query.where:
+            cache.set(self.cache_key(), count, settings.ADMIN_CACHE_TIMEOUT)
+
+    def page(self, number):
+        number = self.validate_number(number)
+        bottom = (number - 1) * self.per_page
+        object_list = list(self.object_list[bottom:bottom + self.per_page])
+        if len(object_list) < self.per_page:
+            real_count = bottom + len(object_list)
+            if not object_list and number > 1:
+                real_count = self.object_list.count()
+            if real_count != self.count:
+                self.clamp(real_count)
+                # Past the real end like any other paginator, while the
+                # first page may still be empty
+                number = self.validate_number(number)
+        return self._get_page(object_list, number, self)
+
+
+class FeedPage(Page):
+    """Page that knows its window of page links."""
+
+    @cached_property
+    def elided_page_range(self):
+        return list(self.paginator.get_elided_page_range(self.number))
+
+
+class FeedPaginator(Paginator):
+    """Paginator for feeds that links only to pages around the current one.
+
+    A full page_range of a big feed renders a link for every page, so
+    templates use page_obj.elided_page_range instead: the first and last
+    pages and a window around the current page, separated by ELLIPSIS.
+    """
+    ELLIPSIS = '…'
+    on_each_side = 3
+    on_ends = 1
+
+    def _get_page(self, *args, **kwargs):
+        return FeedPage(*args, **kwargs)
+
+    def get_elided_page_range(self, number=1):
+        number = self.validate_number(number)
+        on_each_side, on_ends = self.on_each_side, self.on_ends
+        if self.num_pages <= (on_each_side + on_ends) * 2:
+            yield from self.page_range
+            return
+        if number > on_each_side + on_ends + 2:
+            yield from range(1, on_ends + 1)
+            yield self.ELLIPSIS
+            yield from range(number - on_each_side, number + 1)
+        else:
+            yield from range(1, number + 1)
+        if number < self.num_pages - on_each_side - on_ends - 1:
+            yield from range(number + 1, number + on_each_side + 1)
+            yield self.ELLIPSIS
+            yield from range(self.num_pages - on_ends + 1, self.num_pages + 1)
+        else:
+            yield from range(number + 1, self.num_pages + 1)
+
+
+class InvalidCursor(Exception):
+    """Cursor token can not be decoded."""
+
+
+class CursorPaginator:
+    """Keyset paginator over posts ordered by pub_date and id.
+
+    Unlike OFFSET pages, the cost of a page does not depend on how deep
+    it is: the cursor of the last post becomes an index range condition.
+    """
+
+    def __init__(self, post_list, per_page):
+        self.post_list = post_list.order_by('-pub_date', '-pk')
+        self.per_page = per_page
+
+    @staticmethod
+    def encode(post):
+        value = f'{post.pub_date.isoformat()}|{post.pk}'
+        return base64.urlsafe_b64encode(value.encode()).decode()
+
+    @staticmethod
+    def decode(cursor):
+        try:
+            value = base64.urlsafe_b64decode(cursor.encode()).decode()
+            pub_date, pk = value.split('|')
+            return datetime.fromisoformat(pub_date), int(pk)
+        except ValueError as error:
+            raise InvalidCursor(cursor) from error
+
+    def after(self, post_list, cursor):
+        """Return at most a page and one post of post_list after the cursor."""
+        if cursor:
+            pub_date, pk = self.decode(cursor)
+            post_list = post_list.filter(
+                Q(pub_date__lt=pub_date) | Q(pub_date=pub_date, pk__lt=pk))
+        return list(post_list[:self.per_page + 1])
+
+    def page(self, cursor=None):
+        """Return posts after the cursor and the cursor of the next page."""
+        posts = self.after(self.post_list, cursor)
+        if len(posts) <= self.per_page:
+            return posts, None
+        posts = posts[:self.per_page]
+        return posts, self.encode(posts[-1])
+
+
+class MergedCursorPaginator(CursorPaginator):
+    """Keyset paginator over several post querysets merged in one feed.
+
+    Each queryset is read from its own index, e.g. hot and archived posts
+    that may live in different databases, and the rows are merged.
+    """
+
+    def __init__(self, post_lists, per_page):
+        self.post_lists = [post_list.order_by('-pub_date', '-pk')
+                           for post_list in post_lists]
+        self.per_page = per_page
+
+    def page(self, cursor=None):
+        posts = list(heapq.merge(
+            *(self.after(post_list, cursor) for post_list in self.post_lists),
+            key=lambda post: (post.pub_date, post.pk), reverse=True,
+        ))
+        if len(posts) <= self.per_page:
+            return posts, None
+        posts = posts[:self.per_page]
+        return posts, self.encode(posts[-1])
@@ -0,0 +1,123 @@
+import json
+import zlib
+from difflib import SequenceMatcher
+
+from django.conf import settings
+
+from .models import Post, PostRevision
+
+
+def make_delta(old, new):
+    """Return operations rebuilding new text from old.
+
+    Unchanged ranges are stored as [start, end] of the old text, changed
+    ones as the new string itself.
+    """
+    operations = []
+    matcher = SequenceMatcher(None, old, new, autojunk=False)
+    for tag, i1, i2, j1, j2 in matcher.get_opcodes():
+        if tag == 'equal':
+            operations.append([i1, i2])
+        elif tag != 'delete':
+            operations.append(new[j1:j2])
+    return operations
+
+
+def apply_delta(old, operations):
+    return ''.join(
+        old[operation[0]:operation[1]]
+        if isinstance(operation, list) else operation
+        for operation in operations
+    )
+
+
+def encode(value):
+    return zlib.compress(json.dumps(value).encode())
+
+
+def decode(data):
+    return json.loads(zlib.decompress(bytes(data)).decode())
+
+
+def build(post, number, text, previous_text):
+    """Return an unsaved revision with a snapshot or a delta."""
+    is_snapshot = (
+        previous_text is None
+        or (number - 1) % settings.POST_REVISION_SNAPSHOT_EVERY == 0
+    )
+    value = text if is_snapshot else make_delta(previous_text, text)
+    return PostRevision(post=post, number=number,
+                        is_snapshot=is_snapshot, data=encode(value))
+
+
+def texts(revisions):
+    """Yield revisions with their texts, revisions go in number order."""
+    text = None
+    for revision in revisions:
+        value = decode(revision.data)
+        text = value if revision.is_snapshot else apply_delta(text, value)
+        yield revision, text
+
+
+def texts_between(post, low, high):
+    """Return texts of revisions low..high of the post by their numbers.
+
+    Reading starts from the closest snapshot at or before low, so no more
+    than POST_REVISION_SNAPSHOT_EVERY extra revisions are decoded.
+    """
+    snapshot = post.revisions.filter(
+        number__lte=low, is_snapshot=True).order_by('-number')
+    chain = post.revisions.filter(
+        number__gte=snapshot.values('number')[:1],
+        number__lte=high,
+    ).order_by('number')
+    return {
+        revision.number: text
+        for revision, text in texts(chain)
+        if revision.number >= low
+    }
+
+
+def record(post, previous_text):
+    """Save the edit of the post, call it in the transaction of the save.
+
+    The first edit also stores the original text as revision 1. The post
+    row is locked until the commit, so concurrent edits take consecutive
+    numbers, and the delta goes against the text of the latest revision
+    rather than the text the editor started from.
+    """
+    if post.text == previous_text:
+        return
+    Post.objects.select_for_update().values('pk').get(pk=post.pk)
+    latest = post.revisions.order_by('-number').first()
+    if latest is None:
+        latest = build(post, 1, previous_text, None)
+        latest.save()
+    else:
+        previous_text = texts_between(
+            post, latest.number, latest.number)[latest.number]
+        if post.text == previous_text:
+            return
+    build(post, latest.number + 1, post.text, previous_text).save()
+
+
+def compact(post, keep=None):
+    """Re-encode revisions of the post, optionally keep only the last ones.
+
+    Deltas are rebuilt with the current snapshot interval, the oldest
+    kept revision becomes a snapshot. Return the number of revisions.
+    """
+    history = [
+        (revision.number, text)
+        for revision, text in texts(post.revisions.order_by('number'))
+    ]
+    if keep is not None:
+        history = history[-keep:] if keep else []
+    post.revisions.all().delete()
+    previous_text = None
+    revisions = []
+    for number, text in history:
+        revisions.append(build(post, number, text, previous_text))
+        previous_text = text
+    PostRevision.objects.bulk_create(revisions)
+    return len(revisions)
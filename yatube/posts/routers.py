@@ -0,0 +1,42 @@
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS
+
+ARCHIVE_LABEL = 'posts.ArchivedPost'
+
+
+def is_archive(model_or_instance):
+    # _meta of an instance also works through lazy objects like request.user
+    return model_or_instance._meta.label == ARCHIVE_LABEL
+
+
+class ArchiveRouter:
+    """Keep archived posts in settings.POSTS_ARCHIVE_DATABASE.
+
+    Everything else stays in the default database, including users and
+    groups looked up from an archived post.
+    """
+
+    def db_for_read(self, model, **hints):
+        if is_archive(model):
+            return settings.POSTS_ARCHIVE_DATABASE
+        instance = hints.get('instance')
+        if instance is not None and is_archive(instance):
+            return DEFAULT_DB_ALIAS
+        return None
+
+    db_for_write = db_for_read
+
+    def allow_relation(self, obj1, obj2, **hints):
+        if is_archive(obj1) or is_archive(obj2):
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        archive = settings.POSTS_ARCHIVE_DATABASE
+        if archive == DEFAULT_DB_ALIAS:
+            return None
+        if f'{app_label}.{model_name}' == ARCHIVE_LABEL.lower():
+            return db == archive
+        if db == archive:
+            return False
+        return None
@@ -0,0 +1,85 @@
+"""Generation of synthetic posts for manage.py seed.
+
+The module does not import Django, so generation runs in plain worker
+processes. Every chunk has its own random state derived from the seed
+and the chunk number, so the data does not depend on the number of
+workers.
+"""
+import bisect
+import itertools
+import math
+import random
+
+from faker import Faker
+
+LOCALE = 'ru_RU'
+# Exponent of the Zipf distribution of author and group popularity
+ZIPF_EXPONENT = 1.1
+# Share of posts published without a group
+NO_GROUP_SHARE = 0.3
+# Relative activity by hour of the day, UTC
+HOURLY_ACTIVITY = (
+    2, 1, 1, 1, 1, 2, 4, 6, 8, 9, 9, 9,
+    10, 10, 9, 9, 9, 10, 12, 14, 14, 12, 8, 4,
+)
+HOURS = list(itertools.accumulate(HOURLY_ACTIVITY))
+
+
+def faker(seed, *salt):
+    fake = Faker(LOCALE)
+    fake.seed_instance(f'{seed}:{":".join(map(str, salt))}')
+    return fake
+
+
+def zipf_weights(count):
+    """Cumulative weights making the first items the most popular."""
+    return list(itertools.accumulate(
+        1 / rank ** ZIPF_EXPONENT for rank in range(1, count + 1)))
+
+
+def chunk_bounds(chunk, chunks, start, end):
+    """Timestamps of the period of the chunk.
+
+    Periods get shorter towards the end, so the posting rate grows
+    linearly from the start like on a growing site.
+    """
+    span = end - start
+    return (start + span * math.sqrt(chunk / chunks),
+            start + span * math.sqrt((chunk + 1) / chunks))
+
+
+def pub_date(rng, low, high):
+    """Random timestamp in the period, following HOURLY_ACTIVITY."""
+    day = 24 * 60 * 60
+    while True:
+        midnight = rng.uniform(low, high) // day * day
+        hour = bisect.bisect(HOURS, rng.random() * HOURS[-1])
+        timestamp = midnight + (hour + rng.random()) * 60 * 60
+        if low <= timestamp < high:
+            return timestamp
+
+
+def generate_posts(task):
+    """Return (text, timestamp, author index, group index) of a chunk.
+
+    Posts of a chunk are sorted by date and chunks follow each other in
+    time, so primary keys grow with pub_date as on a real site.
+    """
+    seed, chunk, chunks, size, authors, groups, start, end = task
+    rng = random.Random(f'{seed}:posts:{chunk}')
+    fake = faker(seed, 'posts', chunk)
+    author_weights = zipf_weights(authors)
+    group_weights = zipf_weights(groups)
+    low, high = chunk_bounds(chunk, chunks, start, end)
+    posts = []
+    for _ in range(size):
+        author = bisect.bisect(author_weights,
+                               rng.random() * author_weights[-1])
+        group = None
+        if groups and rng.random() >= NO_GROUP_SHARE:
+            group = bisect.bisect(group_weights,
+                                  rng.random() * group_weights[-1])
+        text = fake.paragraph(nb_sentences=rng.randint(1, 8))
+        posts.append((text, pub_date(rng, low, high), author, group))
+    posts.sort(key=lambda post: post[1])
+    return posts
@@ -0,0 +1,99 @@
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models.signals import post_delete, post_init, post_save
+from django.dispatch import receiver
+
+from . import stats, thumbnails, timeline
+from .admin import GROUP_CHOICES_CACHE_KEY
+from .models import ArchivedPost, Follow, Group, GroupStats, Post, User
+
+
+@receiver([post_save, post_delete], sender=Group)
+def reset_group_choices(sender, **kwargs):
+    """Drop cached group choices of the admin when groups change."""
+    cache.delete(GROUP_CHOICES_CACHE_KEY)
+
+
+@receiver(post_save, sender=Group)
+def create_group_stats(sender, instance, created, **kwargs):
+    """New group is listed in the directory right away."""
+    if created:
+        GroupStats.objects.get_or_create(group=instance)
+
+
+@receiver(post_delete, sender=Group)
+def detach_archived_posts(sender, instance, **kwargs):
+    """Archived posts have no constraints, SET_NULL is done here."""
+    ArchivedPost.objects.filter(group_id=instance.pk).update(group=None)
+
+
+@receiver(post_delete, sender=User)
+def delete_archived_posts(sender, instance, **kwargs):
+    """Archived posts have no constraints, CASCADE is done here."""
+    ArchivedPost.objects.filter(author_id=instance.pk).delete()
+
+
+@receiver(post_init, sender=Post)
+def remember_group(sender, instance, **kwargs):
+    """Keep the loaded group to notice when a post changes group."""
+    # __dict__ is read so that a deferred group_id is not loaded
+    instance._initial_group_id = instance.__dict__.get('group_id')
+
+
+@receiver(post_save, sender=Post)
+def count_saved_post(sender, instance, created, **kwargs):
+    old_group_id = None if created else instance._initial_group_id
+    if instance.group_id != old_group_id:
+        if old_group_id is not None:
+            stats.remove_post(old_group_id)
+        if instance.group_id is not None:
+            stats.add_post(instance.group_id, instance.pub_date)
+    instance._initial_group_id = instance.group_id
+
+
+@receiver(post_delete, sender=Post)
+def count_deleted_post(sender, instance, **kwargs):
+    if instance.group_id is not None:
+        stats.remove_post(instance.group_id)
+
+
+def image_name(post):
+    # __dict__ holds a name or a FieldFile, reading it loads nothing
+    image = post.__dict__.get('image')
+    return getattr(image, 'name', image) or None
+
+
+@receiver(post_init, sender=Post)
+def remember_image(sender, instance, **kwargs):
+    instance._initial_image = image_name(instance)
+
+
+@receiver(post_save, sender=Post)
+def schedule_thumbnail(sender, instance, **kwargs):
+    """Generate the feed thumbnail of a new image after commit."""
+    name = image_name(instance)
+    if name and name != instance._initial_image:
+        transaction.on_commit(lambda: thumbnails.schedule(name))
+    instance._initial_image = name
+
+
+@receiver(post_save, sender=Post)
+def fan_out_post(sender, instance, created, **kwargs):
+    if created:
+        timeline.fan_out(instance)
+
+
+@receiver(post_save, sender=Follow)
+def count_follow(sender, instance, created, **kwargs):
+    if created:
+        stats.add_follower(instance.author_id)
+        timeline.backfill(instance)
+
+
+@receiver(post_delete, sender=Follow)
+def count_unfollow(sender, instance, **kwargs):
+    followers = timeline.followers_counts([instance.author_id]).get(
+        instance.author_id, 0)
+    stats.remove_follower(instance.author_id)
+    timeline.forget(instance)
+    timeline.catch_up(instance.author_id, followers)
@@ -0,0 +1,148 @@
+from functools import partial
+from xml.sax.saxutils import escape
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Count, Max
+from django.http import Http404, HttpResponse, StreamingHttpResponse
+from django.urls import reverse
+from django.utils.http import http_date
+
+from core.utils import keyset_rows
+
+from .models import ArchivedPost, Group, Post, User
+
+SITEMAP_CONTENT_TYPE = 'application/xml; charset=utf-8'
+XML_HEADER = '<?xml version="1.0" encoding="UTF-8"?>\n'
+XMLNS = 'xmlns="http://www.sitemaps.org/schemas/sitemap/0.9"'
+
+
+def post_rows(low, high, model=Post):
+    for pk, pub_date in keyset_rows(
+            model.objects.filter(pk__range=(low, high)), 'pub_date'):
+        yield reverse('posts:post_detail', args=[pk]), pub_date
+
+
+def group_rows(low, high):
+    for _, slug, last_post_at in keyset_rows(
+            Group.objects.filter(pk__range=(low, high)),
+            'slug', 'stats__last_post_at'):
+        yield reverse('posts:group_list', args=[slug]), last_post_at
+
+
+def profile_rows(low, high):
+    for _, username in keyset_rows(
+            User.objects.filter(pk__range=(low, high)), 'username'):
+        yield reverse('posts:profile', args=[username]), None
+
+
+def post_lastmod(low, high, model=Post):
+    # pub_date grows with the id, the last post of the range is the newest
+    return model.objects.filter(pk__range=(low, high)).order_by(
+        '-pk').values_list('pub_date', flat=True).first()
+
+
+def group_lastmod(low, high):
+    return Group.objects.filter(pk__range=(low, high)).aggregate(
+        last=Max('stats__last_post_at'))['last']
+
+
+# Section name: model, rows of a shard, lastmod of a shard
+SECTIONS = {
+    'posts': (Post, post_rows, post_lastmod),
+    # Archived posts are still served by post_detail
+    'archive': (ArchivedPost, partial(post_rows, model=ArchivedPost),
+                partial(post_lastmod, model=ArchivedPost)),
+    'groups': (Group, group_rows, group_lastmod),
+    'profiles': (User, profile_rows, lambda low, high: None),
+}
+
+
+def shard_bounds(shard):
+    """Primary key range of the shard, shards are numbered from 1."""
+    size = settings.SITEMAP_SHARD_SIZE
+    return (shard - 1) * size + 1, shard * size
+
+
+def shard_state(model, low, high):
+    """Number and last primary key of the rows of the shard.
+
+    Both change when a row of the shard is added or deleted, so they go
+    into the cache key along with the lastmod.
+    """
+    state = model.objects.filter(pk__range=(low, high)).aggregate(
+        rows=Count('pk'), last=Max('pk'))
+    return f'{state["rows"]}-{state["last"]}'
+
+
+def shards_count(model):
+    last_pk = model.objects.aggregate(last=Max('pk'))['last'] or 0
+    return -(-last_pk // settings.SITEMAP_SHARD_SIZE)
+
+
+def url_entry(request, path, lastmod, tag='url'):
+    entry = f'<{tag}><loc>{escape(request.build_absolute_uri(path))}</loc>'
+    if lastmod is not None:
+        entry += f'<lastmod>{lastmod.date().isoformat()}</lastmod>'
+    return entry + f'</{tag}>\n'
+
+
+def sitemap_index(request):
+    """Index of sitemap shards of posts, groups and profiles."""
+    key = f'sitemap:index:{request.get_host()}'
+    content = cache.get(key)
+    if content is None:
+        entries = []
+        for section, (model, _, lastmod) in SECTIONS.items():
+            for shard in range(1, shards_count(model) + 1):
+                path = reverse('posts:sitemap_section',
+                               args=[section, shard])
+                entries.append(url_entry(
+                    request, path, lastmod(*shard_bounds(shard)),
+                    tag='sitemap'))
+        content = (f'{XML_HEADER}<sitemapindex {XMLNS}>\n'
+                   + ''.join(entries) + '</sitemapindex>\n')
+        cache.set(key, content, settings.SITEMAP_CACHE_TIMEOUT)
+    return HttpResponse(content, content_type=SITEMAP_CONTENT_TYPE)
+
+
+def sitemap_section(request, section, shard):
+    """One shard of at most SITEMAP_SHARD_SIZE urls, streamed.
+
+    The rendered shard is cached under its lastmod and the state of its
+    rows, so it changes in the cache when a newer post gets into it and
+    when rows are added or deleted, like new groups or profiles.
+    """
+    if section not in SECTIONS or shard < 1:
+        raise Http404
+    model, rows, lastmod = SECTIONS[section]
+    if shard > shards_count(model):
+        raise Http404
+    low, high = shard_bounds(shard)
+    modified = lastmod(low, high)
+    key = (f'sitemap:{request.get_host()}:{section}:{shard}:'
+           f'{shard_state(model, low, high)}:'
+           f'{modified.timestamp() if modified else ""}')
+    content = cache.get(key)
+    if content is not None:
+        response = HttpResponse(content, content_type=SITEMAP_CONTENT_TYPE)
+    else:
+        response = StreamingHttpResponse(
+            stream_shard(request, rows(low, high), key),
+            content_type=SITEMAP_CONTENT_TYPE,
+        )
+    if modified is not None:
+        response['Last-Modified'] = http_date(modified.timestamp())
+    return response
+
+
+def stream_shard(request, rows, cache_key):
+    """Yield the shard piece by piece and cache it once it is complete."""
+    parts = [f'{XML_HEADER}<urlset {XMLNS}>\n']
+    yield parts[0]
+    for path, lastmod in rows:
+        parts.append(url_entry(request, path, lastmod))
+        yield parts[-1]
+    parts.append('</urlset>\n')
+    yield parts[-1]
+    cache.set(cache_key, ''.join(parts), settings.SITEMAP_CACHE_TIMEOUT)
@@ -0,0 +1,84 @@
+from django.db.models import Count, F, Max, Value
+from django.db.models.functions import Coalesce, Greatest
+
+from .models import ArchivedPost, AuthorStats, Follow, GroupStats, Post
+
+
+def add_post(group_id, pub_date):
+    """Count a new post of the group."""
+    updated = GroupStats.objects.filter(group_id=group_id).update(
+        posts_count=F('posts_count') + 1,
+        last_post_at=Greatest(
+            Coalesce('last_post_at', Value(pub_date)), Value(pub_date)),
+    )
+    if not updated:
+        rebuild([group_id])
+
+
+def last_post_at(group_id):
+    """Latest post of the group, hot or archived, like rebuild counts."""
+    # The archive may be in another database, so no subquery joins both
+    dates = (
+        model.objects.filter(group_id=group_id).aggregate(
+            last=Max('pub_date'))['last']
+        for model in (Post, ArchivedPost)
+    )
+    return max(filter(None, dates), default=None)
+
+
+def remove_post(group_id):
+    """Uncount a post of the group and find its latest post again."""
+    GroupStats.objects.filter(group_id=group_id).update(
+        posts_count=F('posts_count') - 1,
+        last_post_at=last_post_at(group_id),
+    )
+
+
+def rebuild(group_ids):
+    """Recount the groups from scratch, used after bulk changes."""
+    group_ids = {group_id for group_id in group_ids if group_id is not None}
+    totals = {group_id: {'total': 0, 'last': None} for group_id in group_ids}
+    # Archived posts still belong to their groups
+    for model in (Post, ArchivedPost):
+        rows = model.objects.filter(group_id__in=group_ids).order_by().values(
+            'group_id').annotate(total=Count('pk'), last=Max('pub_date'))
+        for row in rows:
+            group = totals[row['group_id']]
+            group['total'] += row['total']
+            group['last'] = max(
+                filter(None, (group['last'], row['last'])), default=None)
+    for group_id, row in totals.items():
+        GroupStats.objects.update_or_create(
+            group_id=group_id,
+            defaults={
+                'posts_count': row['total'],
+                'last_post_at': row['last'],
+            },
+        )
+
+
+def add_follower(author_id):
+    """Count a new follower of the author."""
+    updated = AuthorStats.objects.filter(author_id=author_id).update(
+        followers_count=F('followers_count') + 1)
+    if not updated:
+        rebuild_followers([author_id])
+
+
+def remove_follower(author_id):
+    AuthorStats.objects.filter(author_id=author_id).update(
+        followers_count=Greatest(F('followers_count') - 1, 0))
+
+
+def rebuild_followers(author_ids):
+    """Recount followers of the authors from scratch."""
+    totals = dict(
+        Follow.objects.filter(author_id__in=author_ids).order_by()
+        .values('author_id').annotate(total=Count('pk'))
+        .values_list('author_id', 'total')
+    )
+    for author_id in set(author_ids):
+        AuthorStats.objects.update_or_create(
+            author_id=author_id,
+            defaults={'followers_count': totals.get(author_id, 0)},
+        )
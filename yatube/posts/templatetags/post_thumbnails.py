@@ -0,0 +1,13 @@
+from django import template
+
+from posts.thumbnails import stored_thumbnail
+
+register = template.Library()
+
+
+@register.simple_tag
+def post_thumbnail(image):
+    """Pre-generated thumbnail of the post image, None while not ready."""
+    if not image:
+        return None
+    return stored_thumbnail(image)
@@ -0,0 +1,199 @@
+from datetime import timedelta
+from http import HTTPStatus
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.test import Client, TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from .. import revisions, stats
+from ..models import (ArchivedPost, Group, GroupStats, Post, PostRevision,
+                      content_hash)
+
+User = get_user_model()
+
+
+class PostAdminTests(TestCase):
+    CHANGELIST_URL = reverse('admin:posts_post_changelist')
+
+    def setUp(self):
+        cache.clear()
+        self.admin = User.objects.create_superuser(
+            username='admin', email='admin@example.com', password='pass')
+        self.admin_client = Client()
+        self.admin_client.force_login(self.admin)
+        self.groups = [
+            Group.objects.create(
+                title=f'Test group {i}',
+                slug=f'test-slug-{i}',
+                description='Test description',
+            ) for i in range(3)
+        ]
+
+    def create_posts(self, count):
+        Post.objects.bulk_create(
+            Post(text='Test text', author=self.admin, group=self.groups[0],
+                 content_hash=content_hash('Test text'))
+            for _ in range(count)
+        )
+        stats.rebuild([self.groups[0].pk])
+
+    def changelist_queries(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.admin_client.get(self.CHANGELIST_URL)
+        self.assertEqual(response.status_code, HTTPStatus.OK)
+        return len(queries)
+
+    def test_changelist_queries_do_not_grow_with_rows(self):
+        """Change list runs the same number of queries for any page size."""
+        self.create_posts(2)
+        self.changelist_queries()
+        few_rows = self.changelist_queries()
+        self.create_posts(20)
+        self.assertEqual(self.changelist_queries(), few_rows)
+
+    def test_changelist_offers_every_group(self):
+        """Editable group column lists all groups."""
+        self.create_posts(1)
+        response = self.admin_client.get(self.CHANGELIST_URL)
+        for group in self.groups:
+            with self.subTest(group=group):
+                self.assertContains(response, group.title)
+
+    def run_action(self, action, **data):
+        data.update({
+            'action': action,
+            'select_across': '1',
+            'index': '0',
+            '_selected_action': Post.objects.values_list('pk', flat=True)[:1],
+        })
+        return self.admin_client.post(self.CHANGELIST_URL, data, follow=True)
+
+    def test_reassign_group_updates_whole_queryset(self):
+        """Reassign action moves every selected post to the group."""
+        self.create_posts(5)
+        target = self.groups[1]
+        response = self.run_action('reassign_group', group=target.pk)
+        self.assertContains(response, 'записей: 5')
+        self.assertEqual(Post.objects.filter(group=target).count(), 5)
+        target.stats.refresh_from_db()
+        self.assertEqual(target.stats.posts_count, 5)
+        self.groups[0].stats.refresh_from_db()
+        self.assertEqual(self.groups[0].stats.posts_count, 0)
+
+    def test_detach_group(self):
+        """Detach action clears the group of selected posts."""
+        self.create_posts(3)
+        self.run_action('detach_group')
+        self.assertFalse(Post.objects.filter(group__isnull=False).exists())
+
+    def test_delete_by_author(self):
+        """Delete by author removes posts outside of the selection too."""
+        self.create_posts(4)
+        other = User.objects.create_user(username='other')
+        Post.objects.create(text='Other text', author=other)
+        self.admin_client.post(self.CHANGELIST_URL, {
+            'action': 'delete_by_author',
+            'index': '0',
+            '_selected_action': Post.objects.filter(
+                author=self.admin).values_list('pk', flat=True)[:1],
+        })
+        self.assertFalse(Post.objects.filter(author=self.admin).exists())
+        self.assertTrue(Post.objects.filter(author=other).exists())
+
+    def test_delete_older_than(self):
+        """Delete older than keeps recent posts."""
+        self.create_posts(2)
+        old_pk = Post.objects.first().pk
+        Post.objects.filter(pk=old_pk).update(
+            pub_date=timezone.now() - timedelta(days=30))
+        self.run_action('delete_older_than', days=7)
+        self.assertFalse(Post.objects.filter(pk=old_pk).exists())
+        self.assertEqual(Post.objects.count(), 1)
+
+    def test_duplicate_filter_groups_copies(self):
+        """Duplicate filter shows only texts repeated enough times."""
+        self.create_posts(3)
+        Post.objects.create(text='Unique text', author=self.admin)
+        response = self.admin_client.get(
+            self.CHANGELIST_URL, {'duplicates': '2'})
+        posts = response.context['cl'].result_list
+        self.assertEqual(len(posts), 3)
+        self.assertEqual(len({post.content_hash for post in posts}), 1)
+
+    def test_duplicate_filter_skips_old_and_unhashed_posts(self):
+        """Posts without a hash or out of the window are not grouped."""
+        self.create_posts(2)
+        Post.objects.update(content_hash='')
+        self.create_posts(2)
+        Post.objects.filter(content_hash='').update(
+            content_hash=content_hash('Test text'),
+            pub_date=timezone.now() - timedelta(days=365))
+        Post.objects.bulk_create(
+            Post(text=f'Test text {i}', author=self.admin)
+            for i in range(2))
+        response = self.admin_client.get(
+            self.CHANGELIST_URL, {'duplicates': '2'})
+        self.assertEqual(len(response.context['cl'].result_list), 2)
+
+    def test_delete_by_author_removes_revisions(self):
+        """Revisions of deleted posts are deleted with them."""
+        post = Post.objects.create(text='Edited text', author=self.admin)
+        revisions.record(post, 'Original text')
+        self.admin_client.post(self.CHANGELIST_URL, {
+            'action': 'delete_by_author',
+            'index': '0',
+            '_selected_action': [post.pk],
+        })
+        self.assertFalse(PostRevision.objects.exists())
+
+
+class ChunkedDeleteTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.admin = User.objects.create_superuser(
+            username='admin', email='admin@example.com', password='pass')
+        self.admin_client = Client()
+        self.admin_client.force_login(self.admin)
+        self.author = User.objects.create_user(username='heavy')
+        self.group = Group.objects.create(
+            title='Test group', slug='test-slug', description='Test')
+        self.posts = [
+            Post.objects.create(
+                text=f'Test text {i}', author=self.author, group=self.group)
+            for i in range(3)
+        ]
+        revisions.record(self.posts[0], 'Original text')
+        ArchivedPost.objects.create(
+            text='Archived text', author=self.author, group=self.group,
+            pub_date=timezone.now() - timedelta(days=365))
+        stats.rebuild([self.group.pk])
+
+    def test_user_delete_in_admin(self):
+        """Confirmation counts posts, deletion removes them in chunks."""
+        url = reverse('admin:auth_user_delete', args=[self.author.pk])
+        response = self.admin_client.get(url)
+        self.assertEqual(
+            dict(response.context['model_count'])['posts'], 4)
+        response = self.admin_client.post(url, {'post': 'yes'}, follow=True)
+        self.assertContains(response, 'Удалено записей: 4')
+        self.assertFalse(User.objects.filter(pk=self.author.pk).exists())
+        self.assertFalse(Post.objects.exists())
+        self.assertFalse(PostRevision.objects.exists())
+        self.assertFalse(ArchivedPost.objects.exists())
+        self.assertEqual(
+            GroupStats.objects.get(group=self.group).posts_count, 0)
+
+    def test_group_delete_command(self):
+        """Posts of a deleted group stay without a group."""
+        out = StringIO()
+        call_command('bulk_delete', group=[self.group.slug], stdout=out)
+        self.assertIn('posts detached: 4', out.getvalue())
+        self.assertFalse(Group.objects.exists())
+        self.assertEqual(Post.objects.filter(group=None).count(), 3)
+        self.assertEqual(ArchivedPost.objects.filter(group=None).count(), 1)
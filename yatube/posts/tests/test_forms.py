@@ -1,6 +1,14 @@
-from django.test import Client, TestCase
+import shutil
+import tempfile
+from io import StringIO
+
+from django.conf import settings
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.test import Client, TestCase, override_settings
 from django.urls import reverse
 
+from .. import revisions, thumbnails
 from ..models import Group, Post, User
 
 
@@ -64,3 +72,104 @@ class PostFormTest(TestCase):
         response = self.authorized_client.get(self.POST_EDIT_URL)
         new_post_text = response.context.get('form').initial['text']
         self.assertNotEqual(old_post_text, new_post_text)
+
+    def test_create_rejects_duplicate_of_author(self):
+        """Same text of the author is rejected within the window."""
+        posts_count = Post.objects.count()
+        response = self.authorized_client.post(
+            self.POST_CREATE_URL, data={'text': '  TEST   text '})
+        self.assertFormError(
+            response, 'form', 'text', 'Вы уже опубликовали такую запись')
+        self.assertEqual(Post.objects.count(), posts_count)
+
+    def test_edit_post_records_revisions(self):
+        """Edits keep the history of the text."""
+        texts = ['Test text'] + [f'Edited text {i}' for i in range(12)]
+        for text in texts[1:]:
+            self.authorized_client.post(self.POST_EDIT_URL, data={
+                'text': text,
+                'group': self.group.id,
+            })
+        self.assertEqual(self.post.revisions.count(), len(texts))
+        self.assertEqual(
+            self.post.revisions.filter(is_snapshot=True).count(), 2)
+        history = revisions.texts_between(self.post, 1, len(texts))
+        self.assertEqual([history[n] for n in sorted(history)], texts)
+        response = self.authorized_client.get(reverse(
+            'posts:post_history', kwargs={'post_id': self.post.id}))
+        self.assertContains(response, texts[-1])
+        revisions.compact(self.post, keep=5)
+        history = revisions.texts_between(self.post, 9, len(texts))
+        self.assertEqual(list(history.values()), texts[-5:])
+
+    def test_compact_revisions_can_run_again(self):
+        """Trimmed histories are compacted by the next run as well."""
+        for i in range(4):
+            self.authorized_client.post(self.POST_EDIT_URL, data={
+                'text': f'Edited text {i}',
+                'group': self.group.id,
+            })
+        call_command('compact_revisions', keep=3, stdout=StringIO())
+        call_command('compact_revisions', keep=2, stdout=StringIO())
+        self.assertEqual(
+            list(self.post.revisions.values_list('number', flat=True)),
+            [4, 5])
+        self.assertEqual(revisions.compact(self.post, keep=0), 0)
+        self.assertFalse(self.post.revisions.exists())
+
+    def test_record_continues_from_latest_revision(self):
+        """An edit started from a stale text still rebuilds correctly."""
+        self.post.text = 'First edit'
+        self.post.save()
+        revisions.record(self.post, 'Test text')
+        self.post.text = 'Second edit'
+        self.post.save()
+        revisions.record(self.post, 'Test text')
+        history = revisions.texts_between(self.post, 1, 3)
+        self.assertEqual(
+            list(history.values()), ['Test text', 'First edit', 'Second edit'])
+
+
+SMALL_GIF = (
+    b'\x47\x49\x46\x38\x39\x61\x02\x00'
+    b'\x01\x00\x80\x00\x00\x00\x00\x00'
+    b'\xFF\xFF\xFF\x21\xF9\x04\x00\x00'
+    b'\x00\x00\x00\x2C\x00\x00\x00\x00'
+    b'\x02\x00\x01\x00\x00\x02\x02\x0C'
+    b'\x0A\x00\x3B'
+)
+
+
+class PostImageTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.media_root = tempfile.mkdtemp()
+        cls.media = override_settings(MEDIA_ROOT=cls.media_root)
+        cls.media.enable()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.media.disable()
+        shutil.rmtree(cls.media_root, ignore_errors=True)
+        super().tearDownClass()
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='image_author')
+        self.authorized_client = Client()
+        self.authorized_client.force_login(self.user)
+
+    def test_feed_shows_placeholder_until_thumbnail_is_ready(self):
+        """Feed never reads the original, only a stored thumbnail."""
+        self.authorized_client.post(reverse('posts:post_create'), data={
+            'text': 'Post with image',
+            'image': SimpleUploadedFile('small.gif', SMALL_GIF, 'image/gif'),
+        })
+        post = Post.objects.get(text='Post with image')
+        self.assertTrue(post.image.name.startswith('posts/small'))
+        response = self.client.get(reverse('posts:index'))
+        self.assertContains(response, 'Картинка обрабатывается')
+        thumbnails.generate(post.image.name)
+        response = self.client.get(reverse('posts:index'))
+        self.assertNotContains(response, 'Картинка обрабатывается')
+        self.assertContains(response, settings.MEDIA_URL + 'cache/')
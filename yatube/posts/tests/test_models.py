@@ -1,6 +1,12 @@
+from datetime import date
+from io import StringIO
+
 from django.contrib.auth import get_user_model
-from django.test import TestCase
-from posts.models import Group, Post
+from django.core.management import call_command
+from django.db import connection
+from django.db.models import Sum
+from django.test import TestCase, TransactionTestCase
+from posts.models import Group, GroupStats, Post, content_hash
 
 
 User = get_user_model()
@@ -30,3 +36,43 @@ class PostModelTest(TestCase):
         post = PostModelTest.post
         expected_object_name = post.text[:15]
         self.assertEqual(expected_object_name, str(post))
+
+
+class SeedTest(TransactionTestCase):
+    options = {'posts': 60, 'users': 5, 'groups': 3, 'days': 30,
+               'until': date(2021, 1, 1), 'seed': 1, 'chunk_size': 25,
+               'stdout': StringIO()}
+
+    def seeded(self):
+        return list(Post.objects.order_by('pk').values_list(
+            'text', 'pub_date', 'author__username', 'group__slug'))
+
+    def test_seed_loads_consistent_data(self):
+        call_command('seed', workers=0, **self.options)
+        self.assertEqual(Post.objects.count(), 60)
+        self.assertEqual(
+            list(Post.objects.order_by('pk')),
+            list(Post.objects.order_by('pub_date')),
+        )
+        self.assertLess(Post.objects.latest('pub_date').pub_date.date(),
+                        self.options['until'])
+        for post in Post.objects.all():
+            self.assertEqual(post.content_hash, content_hash(post.text))
+        self.assertEqual(
+            GroupStats.objects.aggregate(total=Sum('posts_count'))['total'],
+            Post.objects.filter(group__isnull=False).count())
+        with connection.cursor() as cursor:
+            constraints = connection.introspection.get_constraints(
+                cursor, Post._meta.db_table)
+        for index in Post._meta.indexes:
+            self.assertIn(index.name, constraints)
+
+    def test_seed_is_reproducible(self):
+        """Data depends on the seed, not on the number of workers."""
+        call_command('seed', workers=0, **self.options)
+        first = self.seeded()
+        Post.objects.all().delete()
+        Group.objects.all().delete()
+        User.objects.all().delete()
+        call_command('seed', workers=2, **self.options)
+        self.assertEqual(self.seeded(), first)
@@ -0,0 +1,61 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.paginator import EmptyPage
+from django.test import SimpleTestCase, TestCase, override_settings
+
+from ..models import Post
+from ..paginators import EstimatedCountPaginator, FeedPaginator
+
+User = get_user_model()
+
+
+class FeedPaginatorTests(SimpleTestCase):
+    def elided(self, pages, number):
+        paginator = FeedPaginator(range(pages), 1)
+        return paginator.get_page(number).elided_page_range
+
+    def test_short_feed_shows_all_pages(self):
+        """Every page is linked when there are only a few."""
+        self.assertEqual(self.elided(5, 3), [1, 2, 3, 4, 5])
+
+    def test_long_feed_shows_window_around_current_page(self):
+        """Links are bounded by the window on a long feed."""
+        ellipsis = FeedPaginator.ELLIPSIS
+        self.assertEqual(
+            self.elided(50000, 2500),
+            [1, ellipsis, 2497, 2498, 2499, 2500,
+             2501, 2502, 2503, ellipsis, 50000])
+        self.assertEqual(
+            self.elided(50000, 1), [1, 2, 3, 4, ellipsis, 50000])
+        self.assertEqual(
+            self.elided(50000, 50000),
+            [1, ellipsis, 49997, 49998, 49999, 50000])
+
+
+@override_settings(ADMIN_ESTIMATED_COUNT_THRESHOLD=0)
+class EstimatedCountPaginatorTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        author = User.objects.create_user(username='TestUser')
+        posts = [
+            Post.objects.create(text=f'Test text {i}', author=author)
+            for i in range(5)
+        ]
+        Post.objects.filter(pk__in=[posts[1].pk, posts[2].pk]).delete()
+
+    def paginator(self):
+        return EstimatedCountPaginator(Post.objects.order_by('pk'), 2)
+
+    def test_short_page_clamps_estimate(self):
+        """Deleted rows inside the pk range are dropped from the count."""
+        paginator = self.paginator()
+        self.assertEqual(paginator.num_pages, 3)
+        self.assertEqual(len(paginator.page(2)), 1)
+        self.assertEqual(paginator.num_pages, 2)
+        self.assertEqual(self.paginator().count, 3)
+
+    def test_page_past_real_end_is_empty_page(self):
+        paginator = self.paginator()
+        with self.assertRaises(EmptyPage):
+            paginator.page(3)
+        self.assertEqual(paginator.count, 3)
@@ -1,10 +1,26 @@
+import re
+from datetime import timedelta
+from http import HTTPStatus
+from io import StringIO
+from unittest import mock
+
 from django import forms
 from django.conf import settings
 from django.contrib.auth import get_user_model
-from django.test import Client, TestCase
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import OperationalError, connection
+from django.test import (Client, TestCase, TransactionTestCase,
+                         override_settings)
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
+from django.utils import timezone
 
-from ..models import Group, Post
+from .. import sitemaps
+from ..counters import ViewCounter
+from .. import bulk, revisions, stats
+from ..models import (ArchivedPost, AuthorStats, Follow, Group, GroupStats,
+                      Post, PostRevision, TimelineEntry)
 
 User = get_user_model()
 
@@ -204,3 +220,473 @@ class PaginatorViewsTest(TestCase):
             with self.subTest(reverse_template=reverse_template):
                 response = self.client.get(reverse_template + '?page=2')
                 self.assertEqual(len(response.context['page_obj']), expected)
+
+
+class SessionAccessTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='TestUser3')
+        self.group = Group.objects.create(
+            title='Test group_3',
+            slug='test-slug3',
+            description='Test description_3',
+        )
+        Post.objects.create(text='Test text', author=self.user,
+                            group=self.group)
+
+    def test_anonymous_feeds_do_not_touch_sessions(self):
+        """Anonymous feed pages neither read nor create sessions."""
+        feeds = (
+            reverse('posts:index'),
+            reverse('posts:group_list', kwargs={'slug': self.group.slug}),
+            reverse('posts:profile',
+                    kwargs={'username': self.user.username}),
+        )
+        for url in feeds:
+            with self.subTest(url=url):
+                with CaptureQueriesContext(connection) as queries:
+                    response = self.client.get(url)
+                self.assertFalse(any(
+                    'django_session' in query['sql'] for query in queries))
+                self.assertNotIn(settings.SESSION_COOKIE_NAME,
+                                 response.cookies)
+
+
+class FragmentViewsTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='TestUser4')
+        self.group = Group.objects.create(
+            title='Test group_4',
+            slug='test-slug4',
+            description='Test description_4',
+        )
+        Post.objects.bulk_create(
+            Post(text=f'Fragment post {i}', author=self.user,
+                 group=self.group)
+            for i in range(TESTING_ATTEMPTS)
+        )
+
+    def test_fragments_walk_whole_feed(self):
+        """Following next_cursor returns every post exactly once."""
+        fragment_urls = (
+            reverse('posts:index_fragment'),
+            reverse('posts:group_list_fragment',
+                    kwargs={'slug': self.group.slug}),
+            reverse('posts:profile_fragment',
+                    kwargs={'username': self.user.username}),
+        )
+        for url in fragment_urls:
+            with self.subTest(url=url):
+                response = self.client.get(url)
+                first_page = response.json()
+                self.assertEqual(
+                    first_page['html'].count('Fragment post'),
+                    settings.POSTS_IN_PAGINATOR)
+                self.assertTemplateNotUsed(response, 'base.html')
+                second_page = self.client.get(
+                    url, {'cursor': first_page['next_cursor']}).json()
+                self.assertEqual(
+                    second_page['html'].count('Fragment post'),
+                    TESTING_ATTEMPTS - settings.POSTS_IN_PAGINATOR)
+                self.assertIsNone(second_page['next_cursor'])
+
+    def test_fragment_rejects_broken_cursor(self):
+        response = self.client.get(
+            reverse('posts:index_fragment'), {'cursor': 'broken'})
+        self.assertEqual(response.status_code, HTTPStatus.BAD_REQUEST)
+
+
+class GroupDirectoryTest(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='TestUser5')
+        self.big_group = Group.objects.create(
+            title='Big group', slug='big-group', description='Big')
+        self.small_group = Group.objects.create(
+            title='Small group', slug='small-group', description='Small')
+        for _ in range(3):
+            Post.objects.create(text='Test text', author=self.user,
+                                group=self.big_group)
+        self.latest = Post.objects.create(
+            text='Test text', author=self.user, group=self.small_group)
+
+    def directory(self, sort):
+        response = self.client.get(reverse('posts:groups'), {'sort': sort})
+        return [stats.group for stats in response.context['page_obj']]
+
+    def test_directory_sorting(self):
+        """Directory is sorted by last activity or by size."""
+        self.assertEqual(self.directory('activity'),
+                         [self.small_group, self.big_group])
+        self.assertEqual(self.directory('size'),
+                         [self.big_group, self.small_group])
+
+    def test_stats_follow_post_changes(self):
+        """Stats follow creation, group change and deletion of posts."""
+        self.latest.group = self.big_group
+        self.latest.save()
+        big_stats = GroupStats.objects.get(group=self.big_group)
+        small_stats = GroupStats.objects.get(group=self.small_group)
+        self.assertEqual(big_stats.posts_count, 4)
+        self.assertEqual(big_stats.last_post_at, self.latest.pub_date)
+        self.assertEqual(small_stats.posts_count, 0)
+        self.assertIsNone(small_stats.last_post_at)
+        self.latest.delete()
+        big_stats.refresh_from_db()
+        self.assertEqual(big_stats.posts_count, 3)
+        self.assertLess(big_stats.last_post_at, self.latest.pub_date)
+
+
+@override_settings(VIEW_COUNTER_FLUSH_SIZE=100)
+class ViewCounterTest(TestCase):
+    def setUp(self):
+        self.view_counter = ViewCounter()
+        patcher = mock.patch('posts.views.view_counter', self.view_counter)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.user = User.objects.create_user(username='TestUser6')
+        self.posts = [
+            Post.objects.create(text=f'Test text {i}', author=self.user)
+            for i in range(3)
+        ]
+
+    def test_views_are_buffered_and_flushed_in_batch(self):
+        """Hits reach the database only when the buffer is flushed."""
+        self.client.get(reverse('posts:post_detail',
+                                kwargs={'post_id': self.posts[0].pk}))
+        for _ in range(2):
+            self.view_counter.hit(self.posts[1].pk)
+        self.assertEqual(Post.objects.get(pk=self.posts[1].pk).views, 0)
+        with self.assertNumQueries(1):
+            self.view_counter.flush()
+        self.assertEqual(
+            list(Post.objects.order_by('pk').values_list('views', flat=True)),
+            [1, 2, 0])
+
+    def test_index_orders_by_views(self):
+        """Popular order of main page puts most viewed posts first."""
+        self.view_counter.hit(self.posts[0].pk)
+        self.view_counter.flush()
+        response = self.client.get(reverse('posts:index'),
+                                   {'order': 'popular'})
+        self.assertEqual(response.context['page_obj'][0], self.posts[0])
+
+    @override_settings(VIEW_COUNTER_FLUSH_SIZE=1)
+    def test_failed_flush_keeps_views_and_serves_page(self):
+        """A locked database does not fail the page or lose the views."""
+        with mock.patch.object(
+                Post.objects, 'filter',
+                side_effect=OperationalError('database is locked')):
+            with self.assertLogs('posts.counters', 'WARNING'):
+                self.view_counter.hit(self.posts[0].pk)
+        self.assertEqual(self.view_counter.buffer[self.posts[0].pk], 1)
+        self.view_counter.flush()
+        self.assertEqual(Post.objects.get(pk=self.posts[0].pk).views, 1)
+
+
+class WarmCachesTest(TransactionTestCase):
+    def setUp(self):
+        cache.clear()
+        user = User.objects.create_user(username='TestUser8')
+        Post.objects.create(text='Test text', author=user)
+
+    def test_warm_caches_fills_fragment_cache(self):
+        """Warmed fragments are served without database queries."""
+        call_command('warm_caches', pages=1, host='testserver',
+                     stdout=StringIO())
+        with self.assertNumQueries(0):
+            self.client.get(reverse('posts:index_fragment'))
+
+
+@override_settings(SITEMAP_SHARD_SIZE=2)
+class SitemapTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='TestUser7')
+        self.group = Group.objects.create(
+            title='Test group_7',
+            slug='test-slug7',
+            description='Test description_7',
+        )
+        self.posts = [
+            Post.objects.create(text=f'Test text {i}', author=self.user,
+                                group=self.group)
+            for i in range(3)
+        ]
+
+    def shard_url(self, section, shard):
+        return reverse('posts:sitemap_section', args=[section, shard])
+
+    def test_index_lists_shards(self):
+        """Sitemap index points to every shard of every section."""
+        response = self.client.get(reverse('posts:sitemap'))
+        content = response.content.decode()
+        expected = sum(
+            sitemaps.shards_count(model)
+            for model in (Post, ArchivedPost, Group, User))
+        self.assertEqual(content.count('<sitemap>'), expected)
+        last_shard = sitemaps.shards_count(Post)
+        self.assertIn(self.shard_url('posts', last_shard), content)
+
+    def test_shard_is_streamed_then_cached(self):
+        """Shard lists its posts and is served from the cache next time."""
+        url = self.shard_url('posts', sitemaps.shards_count(Post))
+        response = self.client.get(url)
+        self.assertTrue(response.streaming)
+        content = b''.join(response.streaming_content).decode()
+        post_url = reverse('posts:post_detail', args=[self.posts[2].pk])
+        self.assertIn(post_url, content)
+        self.assertIn('Last-Modified', response)
+        cached = self.client.get(url)
+        self.assertFalse(cached.streaming)
+        self.assertEqual(cached.content.decode(), content)
+
+    def test_changed_shard_is_not_served_stale(self):
+        """Deleted posts and new profiles leave the cached shards."""
+        # Shards of two rows: the first post and the new profile get into
+        # the first shards, whose lastmod stays the same
+        posts_url = self.shard_url('posts', 1)
+        profiles_url = self.shard_url('profiles', 1)
+        for url in (posts_url, profiles_url):
+            b''.join(self.client.get(url).streaming_content)
+        deleted_url = reverse(
+            'posts:post_detail', args=[self.posts[0].pk])
+        self.posts[0].delete()
+        User.objects.create_user(username='TestUser8')
+        response = self.client.get(posts_url)
+        self.assertNotIn(
+            deleted_url, b''.join(response.streaming_content).decode())
+        response = self.client.get(profiles_url)
+        self.assertIn(
+            reverse('posts:profile', args=['TestUser8']),
+            b''.join(response.streaming_content).decode())
+
+    def test_missing_shard_is_404(self):
+        response = self.client.get(
+            self.shard_url('posts', sitemaps.shards_count(Post) + 1))
+        self.assertEqual(response.status_code, HTTPStatus.NOT_FOUND)
+
+
+class ArchiveTest(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='TestUser9')
+        self.group = Group.objects.create(
+            title='Test group', slug='archive-test', description='Test')
+        self.posts = [
+            Post.objects.create(
+                text=f'Test text {i}', author=self.user, group=self.group)
+            for i in range(4)
+        ]
+        old = timezone.now() - timedelta(
+            days=settings.POSTS_ARCHIVE_AFTER_DAYS + 1)
+        for age, post in enumerate(reversed(self.posts[:3])):
+            Post.objects.filter(pk=post.pk).update(
+                pub_date=old - timedelta(days=age))
+        # A post with revisions stays in the hot table
+        revisions.record(self.posts[2], 'Previous text')
+        call_command('archive_posts', batch_size=1, stdout=StringIO())
+
+    def test_old_posts_are_moved(self):
+        self.assertCountEqual(
+            Post.objects.values_list('pk', flat=True),
+            [self.posts[2].pk, self.posts[3].pk])
+        archived = ArchivedPost.objects.get(pk=self.posts[0].pk)
+        self.assertEqual(archived.text, self.posts[0].text)
+        self.assertEqual(archived.content_hash, self.posts[0].content_hash)
+
+    def test_post_with_revisions_keeps_history(self):
+        call_command('archive_posts', stdout=StringIO())
+        self.assertTrue(Post.objects.filter(pk=self.posts[2].pk).exists())
+        self.assertTrue(PostRevision.objects.exists())
+
+    def test_archived_post_history_is_empty(self):
+        response = self.client.get(reverse(
+            'posts:post_history', kwargs={'post_id': self.posts[0].pk}))
+        self.assertEqual(response.status_code, HTTPStatus.OK)
+        self.assertEqual(list(response.context['page_obj']), [])
+
+    def test_archived_posts_are_in_sitemap(self):
+        shard = (self.posts[0].pk - 1) // settings.SITEMAP_SHARD_SIZE + 1
+        response = self.client.get(reverse(
+            'posts:sitemap_section', args=['archive', shard]))
+        self.assertIn(
+            reverse('posts:post_detail', args=[self.posts[0].pk]),
+            b''.join(response.streaming_content).decode())
+
+    def test_archived_post_is_shown(self):
+        response = self.client.get(reverse(
+            'posts:post_detail', kwargs={'post_id': self.posts[0].pk}))
+        self.assertEqual(response.context['post'].text, 'Test text 0')
+        self.assertEqual(response.context['posts_count'], 4)
+
+    def test_profile_lists_archived_posts_after_hot_ones(self):
+        response = self.client.get(reverse(
+            'posts:profile', kwargs={'username': self.user.username}))
+        self.assertEqual(response.context['posts_count'], 4)
+        self.assertEqual(
+            [post.pk for post in response.context['page_obj']],
+            [self.posts[3].pk, self.posts[2].pk,
+             self.posts[1].pk, self.posts[0].pk])
+
+    def test_profile_fragments_continue_into_archive(self):
+        cache.clear()
+        url = reverse('posts:profile_fragment',
+                      kwargs={'username': self.user.username})
+        texts = []
+        cursor = None
+        with self.settings(POSTS_IN_PAGINATOR=3):
+            while True:
+                data = {'cursor': cursor} if cursor else {}
+                page = self.client.get(url, data).json()
+                texts += re.findall(r'Test text \d', page['html'])
+                cursor = page['next_cursor']
+                if cursor is None:
+                    break
+        self.assertEqual(
+            texts, [f'Test text {i}' for i in reversed(range(4))])
+
+    def test_group_stats_keep_archived_last_post(self):
+        """Deleting the hot posts leaves the latest archived one."""
+        stats.rebuild([self.group.pk])
+        for post in self.posts[2:]:
+            post.delete()
+        group_stats = GroupStats.objects.get(group=self.group)
+        self.assertEqual(group_stats.posts_count, 2)
+        self.assertEqual(
+            group_stats.last_post_at,
+            ArchivedPost.objects.get(pk=self.posts[1].pk).pub_date)
+
+    def test_group_stats_count_archived_posts(self):
+        stats.rebuild([self.group.pk])
+        self.assertEqual(GroupStats.objects.get(
+            group=self.group).posts_count, 4)
+        self.group.delete()
+        self.assertFalse(ArchivedPost.objects.exclude(group=None).exists())
+        self.user.delete()
+        self.assertFalse(ArchivedPost.objects.exists())
+
+
+class FollowTimelineTest(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='TestReader')
+        self.author = User.objects.create_user(username='TestWriter')
+        self.authorized_client = Client()
+        self.authorized_client.force_login(self.user)
+        self.posts = [
+            Post.objects.create(text=f'Test text {i}', author=self.author)
+            for i in range(3)
+        ]
+
+    def follow(self, author):
+        return self.authorized_client.post(reverse(
+            'posts:profile_follow', kwargs={'username': author.username}))
+
+    def feed(self, cursor=None):
+        data = {'cursor': cursor} if cursor else {}
+        return self.authorized_client.get(
+            reverse('posts:follow_index'), data)
+
+    def feed_pks(self, response):
+        return [post.pk for post in response.context['posts']]
+
+    def test_follow_backfills_and_fans_out(self):
+        self.follow(self.author)
+        self.assertEqual(AuthorStats.objects.get(
+            author=self.author).followers_count, 1)
+        post = Post.objects.create(text='New text', author=self.author)
+        self.assertEqual(
+            self.feed_pks(self.feed()),
+            [post.pk] + [post.pk for post in reversed(self.posts)])
+
+    def test_self_follow_is_ignored(self):
+        self.follow(self.user)
+        self.assertFalse(self.user.follower.exists())
+
+    def test_unfollow_removes_posts(self):
+        self.follow(self.author)
+        self.authorized_client.post(reverse(
+            'posts:profile_unfollow',
+            kwargs={'username': self.author.username}))
+        self.assertFalse(TimelineEntry.objects.exists())
+        self.assertEqual(AuthorStats.objects.get(
+            author=self.author).followers_count, 0)
+        self.assertEqual(self.feed_pks(self.feed()), [])
+
+    def test_posts_of_popular_authors_are_merged(self):
+        other = User.objects.create_user(username='TestOtherWriter')
+        self.follow(other)
+        with self.settings(TIMELINE_FANOUT_LIMIT=0):
+            self.follow(self.author)
+            post = Post.objects.create(text='New text', author=self.author)
+            other_post = Post.objects.create(text='Other text', author=other)
+            response = self.feed()
+        self.assertFalse(TimelineEntry.objects.filter(
+            author=self.author).exists())
+        self.assertEqual(
+            self.feed_pks(response),
+            [other_post.pk, post.pk]
+            + [post.pk for post in reversed(self.posts)])
+
+    @override_settings(POSTS_IN_PAGINATOR=2)
+    def test_feed_is_paginated_by_cursor(self):
+        self.follow(self.author)
+        response = self.feed()
+        self.assertEqual(
+            self.feed_pks(response), [self.posts[2].pk, self.posts[1].pk])
+        response = self.feed(response.context['next_cursor'])
+        self.assertEqual(self.feed_pks(response), [self.posts[0].pk])
+        self.assertIsNone(response.context['next_cursor'])
+        response = self.feed('broken')
+        self.assertEqual(response.status_code, HTTPStatus.BAD_REQUEST)
+
+    def test_feed_read_does_not_write(self):
+        """Overfull timelines are left to trim_timelines, reads only read."""
+        self.follow(self.author)
+        with self.settings(TIMELINE_SIZE=2):
+            with CaptureQueriesContext(connection) as queries:
+                response = self.feed()
+        self.assertEqual(len(self.feed_pks(response)), 3)
+        self.assertFalse([query for query in queries
+                          if query['sql'].startswith('DELETE')])
+        self.assertEqual(TimelineEntry.objects.count(), 3)
+
+    def test_posts_are_written_when_author_is_back_under_limit(self):
+        """Posts merged only on read are not lost when followers leave."""
+        reader = User.objects.create_user(username='TestOtherReader')
+        Follow.objects.create(user=reader, author=self.author)
+        self.follow(self.author)
+        with self.settings(TIMELINE_FANOUT_LIMIT=1):
+            post = Post.objects.create(text='New text', author=self.author)
+            self.assertFalse(
+                TimelineEntry.objects.filter(post=post).exists())
+            Follow.objects.filter(user=reader).delete()
+            self.assertEqual(self.feed_pks(self.feed())[0], post.pk)
+
+    def test_deleted_follower_brings_author_back_under_limit(self):
+        reader = User.objects.create_user(username='TestOtherReader')
+        Follow.objects.create(user=reader, author=self.author)
+        self.follow(self.author)
+        with self.settings(TIMELINE_FANOUT_LIMIT=1):
+            post = Post.objects.create(text='New text', author=self.author)
+            bulk.delete_user(reader)
+            self.assertEqual(self.feed_pks(self.feed())[0], post.pk)
+
+    def test_trim_command_skips_short_timelines(self):
+        self.follow(self.author)
+        reader = User.objects.create_user(username='TestShortReader')
+        TimelineEntry.objects.create(
+            user=reader, post=self.posts[0], author=self.author,
+            pub_date=self.posts[0].pub_date)
+        out = StringIO()
+        with self.settings(TIMELINE_SIZE=2):
+            call_command('trim_timelines', stdout=out)
+        self.assertIn('Timelines trimmed: 1', out.getvalue())
+        self.assertEqual(
+            TimelineEntry.objects.filter(user=self.user).count(), 2)
+        self.assertTrue(TimelineEntry.objects.filter(user=reader).exists())
+
+    def test_followers_count_does_not_go_below_zero(self):
+        stats.remove_follower(self.author.pk)
+        stats.rebuild_followers([self.author.pk])
+        stats.remove_follower(self.author.pk)
+        self.assertEqual(AuthorStats.objects.get(
+            author=self.author).followers_count, 0)
@@ -0,0 +1,87 @@
+import logging
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+
+import django
+from django.conf import settings
+from django.db import connections
+from sorl.thumbnail import default, get_thumbnail
+from sorl.thumbnail.base import ThumbnailBackend
+from sorl.thumbnail.conf import defaults as sorl_defaults
+from sorl.thumbnail.conf import settings as sorl_settings
+from sorl.thumbnail.images import ImageFile
+
+logger = logging.getLogger(__name__)
+
+_executor = None
+
+
+class StoredThumbnailBackend(ThumbnailBackend):
+    """sorl-thumbnail backend that can look thumbnails up without work."""
+
+    def get_stored_thumbnail(self, file_, geometry_string, **options):
+        """Return the thumbnail from the key-value store or None.
+
+        Unlike get_thumbnail, the source is neither opened nor checked
+        for existence, and nothing is generated on a miss.
+        """
+        source = ImageFile(file_)
+        # Options are completed exactly like get_thumbnail does, so that
+        # the name of the thumbnail is the same
+        if sorl_settings.THUMBNAIL_PRESERVE_FORMAT:
+            options.setdefault('format', self._get_format(source))
+        for key, value in self.default_options.items():
+            options.setdefault(key, value)
+        for key, attr in self.extra_options:
+            value = getattr(sorl_settings, attr)
+            if value != getattr(sorl_defaults, attr):
+                options.setdefault(key, value)
+        name = self._get_thumbnail_filename(source, geometry_string, options)
+        return default.kvstore.get(ImageFile(name, default.storage))
+
+
+def stored_thumbnail(image):
+    """Return the pre-generated feed thumbnail of the image or None."""
+    return StoredThumbnailBackend().get_stored_thumbnail(
+        image, settings.POST_THUMBNAIL_GEOMETRY,
+        **settings.POST_THUMBNAIL_OPTIONS)
+
+
+def generate(name):
+    """Create the feed thumbnail of the stored image with the given name."""
+    get_thumbnail(name, settings.POST_THUMBNAIL_GEOMETRY,
+                  **settings.POST_THUMBNAIL_OPTIONS)
+
+
+def _setup_worker():
+    # Workers are spawned, not forked, and do not share connections
+    django.setup()
+
+
+def _generate_in_worker(name):
+    try:
+        generate(name)
+    finally:
+        connections.close_all()
+
+
+def schedule(name):
+    """Generate the thumbnail in the worker pool."""
+    global _executor
+    if not settings.POST_THUMBNAIL_WORKERS:
+        generate(name)
+        return
+    if _executor is None:
+        _executor = ProcessPoolExecutor(
+            max_workers=settings.POST_THUMBNAIL_WORKERS,
+            mp_context=multiprocessing.get_context('spawn'),
+            initializer=_setup_worker,
+        )
+    future = _executor.submit(_generate_in_worker, name)
+    future.add_done_callback(_log_failure)
+
+
+def _log_failure(future):
+    if future.exception() is not None:
+        logger.error('Thumbnail generation failed',
+                     exc_info=future.exception())
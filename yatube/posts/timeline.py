@@ -0,0 +1,147 @@
+"""Follow feed with hybrid fan-out.
+
+A post of an author with at most TIMELINE_FANOUT_LIMIT followers is
+written on create to the timelines of the followers. Posts of authors
+with more followers are not copied and are merged into the feed when it
+is read. When an author drops back to the limit, its recent posts are
+written to the timelines, see catch_up(). Timelines keep about
+TIMELINE_SIZE newest entries, manage.py trim_timelines drops the rest.
+"""
+import heapq
+
+from django.conf import settings
+from django.db.models import Q
+
+from core.utils import pk_chunks
+
+from .models import AuthorStats, Follow, Post, TimelineEntry
+from .paginators import CursorPaginator
+
+
+def followers_counts(author_ids):
+    """Return followers counts of the authors from their stats."""
+    return dict(AuthorStats.objects.filter(
+        author_id__in=author_ids).values_list('author_id', 'followers_count'))
+
+
+def fans_out(author_id):
+    """Posts of the author are written to the timelines of followers."""
+    followers = followers_counts([author_id]).get(author_id, 0)
+    return followers <= settings.TIMELINE_FANOUT_LIMIT
+
+
+def entries(user_id, posts):
+    return [
+        TimelineEntry(user_id=user_id, post_id=post.pk,
+                      author_id=post.author_id, pub_date=post.pub_date)
+        for post in posts
+    ]
+
+
+def fan_out(post):
+    """Write a new post to the timelines of the author's followers."""
+    if not fans_out(post.author_id):
+        return
+    followers = Follow.objects.filter(
+        author_id=post.author_id).values_list('user_id', flat=True)
+    TimelineEntry.objects.bulk_create(
+        (entry for user_id in followers for entry in entries(user_id, [post])),
+        ignore_conflicts=True,
+    )
+
+
+def recent_posts(author_id):
+    return list(Post.objects.filter(author_id=author_id).order_by(
+        '-pub_date').only('pk', 'author_id', 'pub_date')[
+        :settings.TIMELINE_SIZE])
+
+
+def backfill(follow):
+    """Write recent posts of a newly followed author to the timeline."""
+    if not fans_out(follow.author_id):
+        return
+    TimelineEntry.objects.bulk_create(
+        entries(follow.user_id, recent_posts(follow.author_id)),
+        ignore_conflicts=True,
+    )
+
+
+def catch_up(author_id, followers_before):
+    """Backfill all timelines once the author is back under the limit.
+
+    Posts published above TIMELINE_FANOUT_LIMIT were only merged on read,
+    which stops at the limit, so they are written to the timelines of
+    the followers, a chunk of follows at a time.
+    """
+    if (followers_before <= settings.TIMELINE_FANOUT_LIMIT
+            or not fans_out(author_id)):
+        return
+    recent = recent_posts(author_id)
+    follows = Follow.objects.filter(author_id=author_id)
+    for chunk in pk_chunks(follows):
+        followers = follows.filter(pk__in=chunk).values_list(
+            'user_id', flat=True)
+        TimelineEntry.objects.bulk_create(
+            (entry for user_id in followers
+             for entry in entries(user_id, recent)),
+            ignore_conflicts=True,
+        )
+
+
+def forget(follow):
+    """Remove posts of an unfollowed author from the timeline."""
+    TimelineEntry.objects.filter(
+        user_id=follow.user_id, author_id=follow.author_id).delete()
+
+
+def older_than(pub_date, pk, pk_field='pk'):
+    """Condition of rows after the (pub_date, pk) position, newest first."""
+    return (Q(pub_date__lt=pub_date)
+            | Q(pub_date=pub_date, **{f'{pk_field}__lt': pk}))
+
+
+def trim(user_id):
+    """Drop entries of the timeline beyond the TIMELINE_SIZE newest."""
+    timeline = TimelineEntry.objects.filter(user_id=user_id)
+    size = settings.TIMELINE_SIZE
+    boundary = timeline.order_by('-pub_date', '-post_id').values_list(
+        'pub_date', 'post_id')[size:size + 1]
+    for pub_date, post_id in boundary:
+        timeline.filter(
+            Q(pub_date__lt=pub_date)
+            | Q(pub_date=pub_date, post_id__lte=post_id)
+        ).delete()
+
+
+def page(user, cursor=None, per_page=None):
+    """Return posts of the follow feed after the cursor and the next cursor.
+
+    Both sources are read newest first from their indexes, at most one
+    page and one post of each, and merged. An author who went over the
+    fan-out limit has older posts in the timeline as well, so the same
+    post may come from both and is taken once.
+    """
+    per_page = per_page or settings.POSTS_IN_PAGINATOR
+    written = TimelineEntry.objects.filter(user=user)
+    merged = Post.objects.filter(author__in=Follow.objects.filter(
+        user=user,
+        author__author_stats__followers_count__gt=(
+            settings.TIMELINE_FANOUT_LIMIT),
+    ).values('author_id'))
+    if cursor:
+        pub_date, pk = CursorPaginator.decode(cursor)
+        written = written.filter(older_than(pub_date, pk, 'post_id'))
+        merged = merged.filter(older_than(pub_date, pk))
+    written = list(written.order_by('-pub_date', '-post_id').values_list(
+        'pub_date', 'post_id')[:per_page + 1])
+    merged = list(merged.order_by('-pub_date', '-pk').values_list(
+        'pub_date', 'pk')[:per_page + 1])
+    keys = list(dict.fromkeys(heapq.merge(written, merged, reverse=True)))
+    has_more = len(keys) > per_page
+    keys = keys[:per_page]
+    posts = Post.objects.select_related('author', 'group').in_bulk(
+        [pk for _, pk in keys])
+    posts = [posts[pk] for _, pk in keys if pk in posts]
+    if not (has_more and posts):
+        return posts, None
+    return posts, CursorPaginator.encode(posts[-1])
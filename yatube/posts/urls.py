@@ -1,20 +1,41 @@
 from django.urls import path
 
-from . import views
+from . import sitemaps, views
 
 app_name = 'posts'
 
 urlpatterns = [
     # main page
     path('', views.index, name='index'),
+    # directory of groups
+    path('groups/', views.groups, name='groups'),
     # page for a certain group
     path('group/<slug:slug>/', views.group_posts, name='group_list'),
     # User profile
     path('profile/<str:username>/', views.profile, name='profile'),
+    # Posts of followed authors
+    path('follow/', views.follow_index, name='follow_index'),
+    path('profile/<str:username>/follow/', views.profile_follow,
+         name='profile_follow'),
+    path('profile/<str:username>/unfollow/', views.profile_unfollow,
+         name='profile_unfollow'),
+    # Next posts of the feeds for infinite scroll
+    path('fragments/', views.index_fragment, name='index_fragment'),
+    path('group/<slug:slug>/fragments/', views.group_posts_fragment,
+         name='group_list_fragment'),
+    path('profile/<str:username>/fragments/', views.profile_fragment,
+         name='profile_fragment'),
     # One post view
     path('posts/<int:post_id>/', views.post_detail, name='post_detail'),
+    # Revisions of the post
+    path('posts/<int:post_id>/history/', views.post_history,
+         name='post_history'),
     # Create a new post
     path('create/', views.post_create, name='post_create'),
+    # Sitemap index and its shards for crawlers
+    path('sitemap.xml', sitemaps.sitemap_index, name='sitemap'),
+    path('sitemap-<str:section>-<int:shard>.xml', sitemaps.sitemap_section,
+         name='sitemap_section'),
     # Edit post page
     path('posts/<int:post_id>/edit/', views.post_edit, name='post_edit'),
 ]
@@ -1,12 +1,23 @@
 import os
+from datetime import timedelta
 
 from django.conf import settings
 from django.contrib.auth.decorators import login_required
-from django.core.paginator import Paginator
+from django.db import transaction
+from django.http import HttpResponseBadRequest, JsonResponse
 from django.shortcuts import get_object_or_404, redirect, render
+from django.template.loader import render_to_string
+from django.utils import timezone
+from django.views.decorators.cache import cache_page
+from django.views.decorators.http import require_POST
 
+from . import archive, revisions, timeline
+from .counters import view_counter
 from .forms import PostForm
-from .models import Group, Post, User
+from .models import (Follow, Group, GroupStats, Post, PostRevision, User,
+                     content_hash)
+from .paginators import (CursorPaginator, FeedPaginator, InvalidCursor,
+                         MergedCursorPaginator)
 
 
 PATH_TO_INDEX = os.path.join('posts', 'index.html')
@@ -14,23 +25,55 @@ PATH_TO_GROUP_LIST = os.path.join('posts', 'group_list.html')
 PATH_TO_PROFILE = os.path.join('posts', 'profile.html')
 PATH_TO_POST = os.path.join('posts', 'post_detail.html')
 PATH_TO_CREATE_POST = os.path.join('posts', 'create_post.html')
+PATH_TO_POST_HISTORY = os.path.join('posts', 'post_history.html')
+PATH_TO_GROUPS = os.path.join('posts', 'groups.html')
+PATH_TO_POST_LIST = os.path.join('posts', 'includes', 'post_list.html')
+PATH_TO_FOLLOW = os.path.join('posts', 'follow.html')
 
 
 def page_maker(post_list, request):
     """Return paginator."""
-    paginator = Paginator(post_list, settings.POSTS_IN_PAGINATOR)
+    paginator = FeedPaginator(post_list, settings.POSTS_IN_PAGINATOR)
     page_number = request.GET.get('page')
     return paginator.get_page(page_number)
 
 
+def fragment_maker(post_list, request, paginator_class=CursorPaginator):
+    """Return rendered posts after the cursor and the next cursor.
+
+    Only the post list is rendered, without the base.html shell and
+    without a request, so context processors are not run either.
+    """
+    paginator = paginator_class(post_list, settings.POSTS_IN_PAGINATOR)
+    try:
+        posts, next_cursor = paginator.page(request.GET.get('cursor'))
+    except InvalidCursor:
+        return HttpResponseBadRequest()
+    return JsonResponse({
+        'html': render_to_string(PATH_TO_POST_LIST, {'posts': posts}),
+        'next_cursor': next_cursor,
+    })
+
+
+FEED_ORDERINGS = {
+    'new': ('-pub_date',),
+    'popular': ('-views', '-pub_date'),
+}
+
+
 def index(request):
     """Returns main page."""
     template = PATH_TO_INDEX
+    order = request.GET.get('order')
+    if order not in FEED_ORDERINGS:
+        order = 'new'
     post_list = Post.objects.select_related(
-        'group', 'author').all()
+        'group', 'author').order_by(*FEED_ORDERINGS[order])
     title = 'Main page for project Yatube'
     context = {
         'title': title,
+        'order': order,
+        'page_query': f'order={order}&',
         'page_obj': page_maker(request=request, post_list=post_list),
     }
     return render(request, template, context)
@@ -48,25 +91,78 @@ def group_posts(request, slug):
     return render(request, template, context)
 
 
+GROUP_ORDERINGS = {
+    'activity': ('-last_post_at', 'pk'),
+    'size': ('-posts_count', 'pk'),
+}
+
+
+def groups(request):
+    """Returns directory of groups sorted by activity or size."""
+    template = PATH_TO_GROUPS
+    sort = request.GET.get('sort')
+    if sort not in GROUP_ORDERINGS:
+        sort = 'activity'
+    stats_list = GroupStats.objects.select_related('group').order_by(
+        *GROUP_ORDERINGS[sort])
+    context = {
+        'sort': sort,
+        'page_query': f'sort={sort}&',
+        'page_obj': page_maker(request=request, post_list=stats_list),
+    }
+    return render(request, template, context)
+
+
 def profile(request, username):
     """Model and the creation of the context dict for user."""
     template = PATH_TO_PROFILE
     author = get_object_or_404(User, username=username)
-    post_list = author.posts.select_related('group', 'author').all()
+    post_list = archive.AuthorPosts(author)
+    following = request.user.is_authenticated and Follow.objects.filter(
+        user=request.user, author=author).exists()
     context = {
         'author': author,
-        'posts_count': author.posts.count(),
+        'following': following,
+        'posts_count': post_list.count(),
         'page_obj': page_maker(request=request, post_list=post_list)
     }
     return render(request, template, context)
 
 
+@cache_page(settings.FRAGMENT_CACHE_TIMEOUT)
+def index_fragment(request):
+    """Returns next posts of main page."""
+    post_list = Post.objects.select_related('group', 'author')
+    return fragment_maker(request=request, post_list=post_list)
+
+
+@cache_page(settings.FRAGMENT_CACHE_TIMEOUT)
+def group_posts_fragment(request, slug):
+    """Returns next posts of group page."""
+    post_list = Post.objects.select_related(
+        'group', 'author').filter(group__slug=slug)
+    return fragment_maker(request=request, post_list=post_list)
+
+
+@cache_page(settings.FRAGMENT_CACHE_TIMEOUT)
+def profile_fragment(request, username):
+    """Returns next posts of user profile, archived ones included."""
+    author = get_object_or_404(User, username=username)
+    post_list = archive.AuthorPosts(author)
+    return fragment_maker(
+        request=request,
+        post_list=[post_list.hot, post_list.archived],
+        paginator_class=MergedCursorPaginator,
+    )
+
+
 def post_detail(request, post_id):
     """Model and the creation of the context dict for posts."""
     template = PATH_TO_POST
-    post = get_object_or_404(Post, pk=post_id)
-    author = post.author
-    posts_count = author.posts.count()
+    post = archive.get_post_or_404(post_id)
+    if isinstance(post, Post):
+        view_counter.hit(post.pk)
+    posts_count = archive.AuthorPosts(post.author).count()
     context = {
         'post': post,
         'posts_count': posts_count,
@@ -74,10 +170,45 @@ def post_detail(request, post_id):
     return render(request, template, context)
 
 
+def post_history(request, post_id):
+    """Page of revisions of the post, newest first."""
+    template = PATH_TO_POST_HISTORY
+    post = archive.get_post_or_404(post_id)
+    # Posts with revisions are never archived
+    history = (post.revisions.order_by('-number') if isinstance(post, Post)
+               else PostRevision.objects.none())
+    page_obj = page_maker(request=request, post_list=history)
+    revision_list = list(page_obj)
+    if revision_list:
+        texts = revisions.texts_between(
+            post, revision_list[-1].number, revision_list[0].number)
+        for revision in revision_list:
+            revision.text = texts[revision.number]
+    context = {
+        'post': post,
+        'page_obj': page_obj,
+    }
+    return render(request, template, context)
+
+
+def is_duplicate(author, text):
+    """Check for the same text of the author within the window."""
+    since = timezone.now() - timedelta(
+        seconds=settings.DUPLICATE_POST_WINDOW)
+    return Post.objects.filter(
+        content_hash=content_hash(text),
+        author=author,
+        pub_date__gte=since,
+    ).exists()
+
+
 @login_required
 def post_create(request):
     template = PATH_TO_CREATE_POST
-    form = PostForm(request.POST or None)
+    form = PostForm(request.POST or None, files=request.FILES or None)
+    if form.is_valid() and is_duplicate(
+            request.user, form.cleaned_data['text']):
+        form.add_error('text', 'Вы уже опубликовали такую запись')
     if form.is_valid():
         post = form.save(commit=False)
         post.author = request.user
@@ -97,9 +228,49 @@ def post_edit(request, post_id):
     required_post = Post.objects.get(pk=post_id)
     if required_post.author != request.user:
         return redirect('posts:post_detail', post_id=post_id)
-    form = PostForm(request.POST or None, instance=required_post)
+    previous_text = required_post.text
+    form = PostForm(
+        request.POST or None,
+        files=request.FILES or None,
+        instance=required_post,
+    )
     if form.is_valid():
-        form.save()
+        with transaction.atomic():
+            post = form.save()
+            revisions.record(post, previous_text)
         return redirect('posts:post_detail', post_id=post_id)
     context = {'form': form, 'required_post': required_post, 'is_edit': True}
     return render(request, template, context)
+
+
+@login_required
+def follow_index(request):
+    """Returns posts of followed authors, paginated by cursor."""
+    template = PATH_TO_FOLLOW
+    cursor = request.GET.get('cursor')
+    try:
+        posts, next_cursor = timeline.page(request.user, cursor)
+    except InvalidCursor:
+        return HttpResponseBadRequest()
+    context = {
+        'posts': posts,
+        'next_cursor': next_cursor,
+    }
+    return render(request, template, context)
+
+
+@login_required
+@require_POST
+def profile_follow(request, username):
+    author = get_object_or_404(User, username=username)
+    if author != request.user:
+        Follow.objects.get_or_create(user=request.user, author=author)
+    return redirect('posts:profile', username=username)
+
+
+@login_required
+@require_POST
+def profile_unfollow(request, username):
+    Follow.objects.filter(
+        user=request.user, author__username=username).delete()
+    return redirect('posts:profile', username=username)
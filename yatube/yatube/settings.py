@@ -46,14 +46,21 @@ INSTALLED_APPS = [
     'django.contrib.sessions',
     'django.contrib.messages',
     'django.contrib.staticfiles',
+    'sorl.thumbnail',
 ]
 
 MIDDLEWARE = [
+    'core.middleware.metrics.MetricsMiddleware',
+    'core.middleware.timing.ServerTimingMiddleware',
+    'core.middleware.slow_queries.SlowQueryMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
-    'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'core.middleware.auth.CachedAuthenticationMiddleware',
+    'core.middleware.ratelimit.RateLimitMiddleware',
+    'core.middleware.memory.MemoryProfileMiddleware',
+    'core.middleware.profile.RequestProfileMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
@@ -61,12 +68,21 @@ MIDDLEWARE = [
 ROOT_URLCONF = 'yatube.urls'
 
 TEMPLATES_DIR = os.path.join(BASE_DIR, 'templates')
+# Templates are minified once when they are compiled
+_loaders = [
+    ('core.loaders.MinifyingLoader', [
+        'django.template.loaders.filesystem.Loader',
+        'django.template.loaders.app_directories.Loader',
+    ]),
+]
+if not DEBUG:
+    _loaders = [('django.template.loaders.cached.Loader', _loaders)]
 TEMPLATES = [
     {
-        'BACKEND': 'django.template.backends.django.DjangoTemplates',
+        'BACKEND': 'core.timing.TimedDjangoTemplates',
         'DIRS': [TEMPLATES_DIR],
-        'APP_DIRS': True,
         'OPTIONS': {
+            'loaders': _loaders,
             'context_processors': [
                 'django.template.context_processors.debug',
                 'django.template.context_processors.request',
@@ -80,6 +96,9 @@ TEMPLATES = [
 
 WSGI_APPLICATION = 'yatube.wsgi.application'
 
+# Test runs keep their state to themselves, see core.testing
+TEST_RUNNER = 'core.testing.TestRunner'
+
 
 # Database
 # https://docs.djangoproject.com/en/2.2/ref/settings/#databases
@@ -91,6 +110,128 @@ DATABASES = {
     }
 }
 
+# Posts older than POSTS_ARCHIVE_AFTER_DAYS are moved by manage.py
+# archive_posts to the archive table in POSTS_ARCHIVE_DATABASE. To keep it
+# in a file of its own, add e.g. an 'archive' database, point the setting
+# to it and run manage.py migrate --database archive.
+
+DATABASE_ROUTERS = ['posts.routers.ArchiveRouter']
+POSTS_ARCHIVE_DATABASE = 'default'
+POSTS_ARCHIVE_AFTER_DAYS = 180
+
+
+# Sessions
+# Backend name from django.contrib.sessions.backends: 'cached_db' serves
+# authenticated requests from the cache, 'signed_cookies' keeps sessions
+# in the client cookie and never touches the database. 'cache' and
+# 'cached_db' need SESSION_CACHE_ALIAS shared by all workers, e.g.
+# memcached or redis, a per-process cache is refused on start.
+
+SESSION_BACKEND = 'db'
+SESSION_ENGINE = f'django.contrib.sessions.backends.{SESSION_BACKEND}'
+SESSION_SAVE_EVERY_REQUEST = False
+
+
+# Cache
+# Rate limits and sessions need a cache shared by all worker processes,
+# e.g. memcached or redis, when more than one worker is run. Backends of
+# core.cache count hits and misses in the metrics.
+
+CACHES = {
+    'default': {
+        'BACKEND': 'core.cache.LocMemCache',
+    },
+}
+
+
+# Authenticated users
+# Alias of the cache users are served from for AUTH_USER_CACHE_TIMEOUT
+# seconds, None loads them from the database on every request. The entry
+# is dropped on save and logout, so the cache must be shared by all
+# workers, e.g. memcached or redis: with a per-process cache other workers
+# would keep serving a deactivated user or a logged out session.
+
+AUTH_USER_CACHE = None
+AUTH_USER_CACHE_TIMEOUT = 60
+
+
+# Rate limits of writes by view name: `rate` requests per `period`
+# seconds for each user and for each IP address. Buckets are kept in the
+# RATE_LIMIT_CACHE alias, a cache shared by all workers such as memcached
+# or redis, None turns the limits off. Behind a proxy list its address in
+# RATE_LIMIT_TRUSTED_PROXIES, the client address is then read from
+# X-Forwarded-For.
+
+RATE_LIMIT_CACHE = None
+RATE_LIMIT_TRUSTED_PROXIES = []
+RATE_LIMITS = {
+    'posts:post_create': {'rate': 10, 'period': 60},
+    'posts:post_edit': {'rate': 30, 'period': 60},
+}
+
+
+# Share of responses with a Server-Timing header
+
+SERVER_TIMING_SAMPLE_RATE = 1 if DEBUG else 0.1
+
+
+# Queries slower than SLOW_QUERY_THRESHOLD seconds are logged with their plan
+# as JSON lines, None disables the log
+
+SLOW_QUERY_THRESHOLD = 0.1
+SLOW_QUERY_LOG = os.path.join(BASE_DIR, 'slow_queries.log')
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'formatters': {
+        'message': {'format': '%(message)s'},
+    },
+    'handlers': {
+        'slow_queries': {
+            'class': 'logging.handlers.RotatingFileHandler',
+            'filename': SLOW_QUERY_LOG,
+            'maxBytes': 10 * 1024 * 1024,
+            'backupCount': 5,
+            'delay': True,
+            'formatter': 'message',
+        },
+    },
+    'loggers': {
+        'yatube.slow_queries': {
+            'handlers': ['slow_queries'],
+            'level': 'WARNING',
+            'propagate': False,
+        },
+    },
+}
+
+
+# Metrics
+# Every worker writes its metrics to METRICS_DIR every METRICS_FLUSH_INTERVAL
+# seconds, /metrics sums them. Files of exited workers are folded into
+# totals.json, keep the directory between restarts.
+
+METRICS_DIR = os.path.join(BASE_DIR, 'metrics')
+METRICS_FLUSH_INTERVAL = 5
+
+
+# Memory profiling of requests by staff sending the X-Profile-Memory header
+
+MEMORY_PROFILING = False
+MEMORY_PROFILE_HEADER = 'HTTP_X_PROFILE_MEMORY'
+MEMORY_PROFILE_DIR = os.path.join(BASE_DIR, 'profiles', 'memory')
+MEMORY_PROFILE_FRAMES = 10
+MEMORY_PROFILE_TOP = 10
+
+
+# cProfile of requests by staff sending a token of manage.py profile_token
+
+REQUEST_PROFILING = False
+REQUEST_PROFILE_DIR = os.path.join(BASE_DIR, 'profiles', 'cprofile')
+REQUEST_PROFILE_KEEP = 50
+REQUEST_PROFILE_TOKEN_MAX_AGE = 60 * 60
+
 
 # Password validation
 # https://docs.djangoproject.com/en/2.2/ref/settings/#auth-password-validators
@@ -134,6 +275,20 @@ STATICFILES_DIRS = [os.path.join(BASE_DIR, 'static')]
 
 STATIC_URL = '/static/'
 
+# Uploaded files
+
+MEDIA_URL = '/media/'
+MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
+
+# Thumbnails of post images
+# Feeds only show thumbnails found in the sorl-thumbnail key-value store,
+# they are generated by a pool of POST_THUMBNAIL_WORKERS processes after
+# upload. With 0 workers they are generated right in the saving process.
+
+POST_THUMBNAIL_GEOMETRY = '960x339'
+POST_THUMBNAIL_OPTIONS = {'crop': 'center', 'upscale': True}
+POST_THUMBNAIL_WORKERS = 2
+
 # Pages to show in LogIn and LogOut
 
 LOGIN_URL = 'users:login'
@@ -141,10 +296,52 @@ LOGIN_REDIRECT_URL = 'posts:index'
 # LOGOUT_REDIRECT_URL = 'posts:index'
 
 # Email Simulation
+# Requests only put emails into the outbox, the send_outbox command
+# delivers them through OUTBOX_EMAIL_BACKEND.
 
-EMAIL_BACKEND = 'django.core.mail.backends.filebased.EmailBackend'
+EMAIL_BACKEND = 'core.mail.OutboxEmailBackend'
+OUTBOX_EMAIL_BACKEND = 'django.core.mail.backends.filebased.EmailBackend'
 EMAIL_FILE_PATH = os.path.join(BASE_DIR, 'sent_emails')
+OUTBOX_BATCH_SIZE = 100
+OUTBOX_MAX_ATTEMPTS = 5
+# Seconds before the first retry, doubled on every next attempt
+OUTBOX_RETRY_DELAY = 60
+# Seconds a claimed message is hidden from other workers
+OUTBOX_LEASE_TIMEOUT = 300
 
 # Paginator
 
 POSTS_IN_PAGINATOR = 10
+# Post views are flushed to the database after this many hits
+# or seconds, whichever comes first
+VIEW_COUNTER_FLUSH_SIZE = 100
+VIEW_COUNTER_FLUSH_INTERVAL = 10
+# Seconds in which the same text of an author is rejected as duplicate
+DUPLICATE_POST_WINDOW = 60 * 60
+# Every N-th revision of a post is stored in full, others as deltas
+POST_REVISION_SNAPSHOT_EVERY = 10
+# Seconds a rendered feed fragment is cached for its cursor
+FRAGMENT_CACHE_TIMEOUT = 60
+# Follow feed: posts of authors with up to TIMELINE_FANOUT_LIMIT followers
+# are written to timelines of the followers, which keep TIMELINE_SIZE
+# newest posts once manage.py trim_timelines is run. Posts of other
+# authors are merged in on read.
+TIMELINE_FANOUT_LIMIT = 1000
+TIMELINE_SIZE = 500
+
+# Admin
+
+ADMIN_CACHE_TIMEOUT = 60
+ADMIN_ESTIMATED_COUNT_THRESHOLD = 10000
+# Days of posts searched by the duplicates filter of the post admin
+ADMIN_DUPLICATE_WINDOW_DAYS = 30
+
+# Sitemap
+# Shards cover SITEMAP_SHARD_SIZE primary keys, the limit of a sitemap
+
+SITEMAP_SHARD_SIZE = 50000
+SITEMAP_CACHE_TIMEOUT = 60 * 60
+
+# Bulk operations
+
+BULK_CHUNK_SIZE = 1000
@@ -7,6 +7,7 @@ For more information on this file, see
 https://docs.djangoproject.com/en/2.2/howto/deployment/wsgi/
 """
 
+import atexit
 import os
 
 from django.core.wsgi import get_wsgi_application
@@ -14,3 +15,11 @@ from django.core.wsgi import get_wsgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'yatube.settings')
 
 application = get_wsgi_application()
+
+# Buffers of a serving process are written when it exits. Management
+# commands and tests never load this module, so they do not flush.
+from core.metrics import metrics  # noqa: E402
+from posts.counters import view_counter  # noqa: E402
+
+atexit.register(view_counter.flush_on_exit)
+atexit.register(metrics.flush_on_exit)